@@ -1,36 +1,110 @@
 import asyncio
-from fastapi import FastAPI
-from threading import Thread
+from fastapi import Body, FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse
+from threading import Event, Thread
 import bot
+from metrics import REGISTRY
 
 app = FastAPI()
 
 bot_loop = None
+bot_task = None
 bot_thread = None
+loop_ready = Event()
+STOP_TIMEOUT = 30  # seconds for every strategy to detach and save before /stop gives up waiting
 
-def run_bot():
-    global bot_loop
+def run_bot(default=True):
+    global bot_loop, bot_task
     bot_loop = asyncio.new_event_loop()
     asyncio.set_event_loop(bot_loop)
-    bot_loop.run_until_complete(bot.main_bot_loop())
+    bot.new_runner()
+    bot_task = bot_loop.create_task(bot.main_bot_loop(default))
+    loop_ready.set()
+    try:
+        bot_loop.run_until_complete(bot_task)
+    except asyncio.CancelledError:
+        pass
+    finally:
+        bot_loop.close()
+
+def bot_running():
+    return bot_thread is not None and bot_thread.is_alive()
+
+def start_thread(default=True):
+    global bot_thread
+    if bot_running():
+        return False
+    loop_ready.clear()
+    bot_thread = Thread(target=run_bot, args=(default,), daemon=True)
+    bot_thread.start()
+    loop_ready.wait()
+    return True
+
+def on_bot_loop(coro, timeout=60):
+    # Strategies live on the bot loop; FastAPI handlers run in worker threads
+    return asyncio.run_coroutine_threadsafe(coro, bot_loop).result(timeout)
+
+async def _call(fn, *args):
+    return fn(*args)
 
 @app.get("/")
 def read_root():
     return {"message": "Angel One Trading Bot Server running."}
 
+@app.get("/feed")
+def feed_stats():
+    if bot.engine is None or bot.engine.tick_queue is None:
+        return {"status": "Feed not connected"}
+    return bot.engine.tick_queue.stats()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return REGISTRY.render()
+
 @app.post("/start")
 def start_bot():
-    global bot_thread
-    if bot_thread and bot_thread.is_alive():
+    if start_thread():
+        return {"status": "Bot started"}
+    # The loop may already be up for strategies added through /strategies
+    if "default" in on_bot_loop(_call(lambda: set(bot.runner.strategies))):
         return {"status": "Bot already running"}
-    bot_thread = Thread(target=run_bot, daemon=True)
-    bot_thread.start()
+    on_bot_loop(bot.start_strategy())
     return {"status": "Bot started"}
 
 @app.post("/stop")
 def stop_bot():
-    global bot_loop
-    if bot_loop:
-        bot_loop.stop()
+    if not bot_running():
+        return {"status": "Bot not running"}
+    # Cancelling the main task runs runner.close() on the loop: every strategy
+    # detaches and saves its state, and the history store flushes
+    bot_loop.call_soon_threadsafe(bot_task.cancel)
+    bot_thread.join(STOP_TIMEOUT)
+    if bot_thread.is_alive():
         return {"status": "Bot stopping"}
-    return {"status": "Bot not running"}
+    return {"status": "Bot stopped"}
+
+@app.get("/strategies")
+def list_strategies():
+    if not bot_running():
+        return []
+    return on_bot_loop(_call(bot.runner.describe))
+
+@app.post("/strategies")
+def start_strategy(spec: dict = Body(...)):
+    # e.g. {"name": "fast", "fast": 5, "slow": 13, "expiry_date": "...", "lot_size": 25, "account": "default"}
+    start_thread(default=False)
+    try:
+        engine = on_bot_loop(bot.start_strategy(spec))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": f"Strategy {engine.name} started"}
+
+@app.delete("/strategies/{name}")
+def stop_strategy(name: str):
+    if not bot_running():
+        raise HTTPException(status_code=404, detail="Bot not running")
+    try:
+        on_bot_loop(bot.runner.stop(name))
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Strategy {name} not running")
+    return {"status": f"Strategy {name} stopped"}
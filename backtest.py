@@ -0,0 +1,181 @@
+import argparse
+import bisect
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from indicators import MovingAverages
+from strategy import (StrategyConfig, update_candles_ms, entry_signal, entry_strike, new_position,
+                      fill_position, trail_position)
+
+# Offline replay of historical ticks (or OHLC bars) through the live strategy
+# rules, with a simulated fill model standing in for placeOrder.
+
+
+def _epoch_ms(col):
+    if np.issubdtype(col.dtype, np.integer):
+        return col.to_numpy(dtype=np.int64)
+    return pd.to_datetime(col).to_numpy(dtype="datetime64[ms]").astype(np.int64)
+
+
+def read_frame(path):
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+
+def ohlc_to_ticks(ts, o, h, l, c):
+    # Four ticks per bar, 1 ms apart: O,L,H,C on up bars and O,H,L,C on down bars.
+    up = c >= o
+    mid1 = np.where(up, l, h)
+    mid2 = np.where(up, h, l)
+    prices = np.column_stack([o, mid1, mid2, c]).ravel()
+    stamps = (ts[:, None] + np.arange(4)).ravel()
+    return stamps, prices
+
+
+def load_prices(path, token="256265"):
+    if os.path.isdir(path):
+        # A HistoryStore directory: the token's recorded ticks, memory-mapped
+        from history import HistoryStore
+        table = HistoryStore(path).read_ticks(token)
+        return table.column("ts_ms").to_numpy(), table.column("ltp").to_numpy()
+    df = read_frame(path)
+    ts = _epoch_ms(df["timestamp"])
+    for col in ("price", "lastprice", "ltp"):
+        if col in df:
+            return ts, df[col].to_numpy(dtype=np.float64)
+    return ohlc_to_ticks(ts, *(df[k].to_numpy(dtype=np.float64) for k in ("open", "high", "low", "close")))
+
+
+def load_option_ticks(path):
+    # CSV/Parquet with timestamp, strike, price for the traded expiry's calls.
+    df = read_frame(path)
+    df["timestamp"] = _epoch_ms(df["timestamp"])
+    df = df.sort_values("timestamp", kind="stable")
+    return {
+        float(strike): (g["timestamp"].tolist(), g["price"].astype(float).tolist())
+        for strike, g in df.groupby("strike")
+    }
+
+
+class FillModel:
+    def __init__(self, slippage=0.0, cost_per_order=0.0):
+        self.slippage = slippage
+        self.cost_per_order = cost_per_order
+
+    def buy(self, price):
+        return price + self.slippage
+
+    def sell(self, price):
+        return max(price - self.slippage, 0.0)
+
+
+def run_backtest(ts, prices, config=None, lot_size=50, fill=None, option_ticks=None, time_value=50.0):
+    # Without option ticks the premium is approximated as intrinsic + a flat time value.
+    config = config or StrategyConfig()
+    fill = fill or FillModel()
+    minutes = config.candle_minutes
+    candles = []
+    state = {'candles': candles, 'position': None, 'traded_candle': None}
+    indicators = MovingAverages(config.fast, config.slow)
+    trades = []
+    equity = peak = max_drawdown = 0.0
+    opt_ts = opt_px = None
+    j = 0
+    strike = None
+
+    def close(exit_ltp):
+        nonlocal equity, peak, max_drawdown
+        pos = state['position']
+        pnl = (fill.sell(exit_ltp) - pos['entry_price']) * lot_size - 2 * fill.cost_per_order
+        trades.append(pnl)
+        equity += pnl
+        peak = max(peak, equity)
+        max_drawdown = max(max_drawdown, peak - equity)
+        state['position'] = None
+
+    started = time.perf_counter()
+    for t, p in zip(ts.tolist(), prices.tolist()):
+        update_candles_ms(candles, t, p, minutes)
+        indicators.update(candles)
+        pos = state['position']
+        if pos is None:
+            last = entry_signal(indicators, state)
+            if last is None:
+                continue
+            strike = entry_strike(last, config)
+            if option_ticks is not None:
+                if float(strike) not in option_ticks:
+                    continue
+                opt_ts, opt_px = option_ticks[float(strike)]
+                j = bisect.bisect_right(opt_ts, t)
+                if j == 0:
+                    continue
+                ltp = opt_px[j - 1]
+            else:
+                ltp = max(p - strike, 0.0) + time_value
+            state['position'] = new_position(strike, None, None, config)
+            fill_position(state['position'], fill.buy(ltp), config)
+            state['traded_candle'] = last['timestamp']
+        elif option_ticks is not None:
+            while j < len(opt_ts) and opt_ts[j] <= t:
+                ltp = opt_px[j]
+                j += 1
+                if trail_position(pos, ltp, config)[1]:
+                    close(ltp)
+                    break
+        else:
+            ltp = max(p - strike, 0.0) + time_value
+            if trail_position(pos, ltp, config)[1]:
+                close(ltp)
+
+    if state['position'] is not None:
+        if option_ticks is not None:
+            close(opt_px[j - 1])
+        else:
+            close(max(float(prices[-1]) - strike, 0.0) + time_value)
+    elapsed = time.perf_counter() - started
+    wins = sum(1 for pnl in trades if pnl > 0)
+    return {
+        'pnl': equity,
+        'trades': len(trades),
+        'wins': wins,
+        'win_rate': wins / len(trades) if trades else 0.0,
+        'max_drawdown': max_drawdown,
+        'ticks': len(ts),
+        'seconds': elapsed,
+        'ticks_per_min': len(ts) / elapsed * 60 if elapsed else float('inf'),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest the MA crossover bot on historical data")
+    parser.add_argument("prices", help="CSV/Parquet of underlying ticks (timestamp, price) or OHLC bars, "
+                                       "or a history.py directory")
+    parser.add_argument("--token", default="256265", help="instrument to read from a history directory")
+    parser.add_argument("--options", help="CSV/Parquet of option ticks (timestamp, strike, price)")
+    parser.add_argument("--lot-size", type=int, default=50)
+    parser.add_argument("--slippage", type=float, default=0.0)
+    parser.add_argument("--cost", type=float, default=0.0, help="flat cost per order")
+    parser.add_argument("--time-value", type=float, default=50.0)
+    parser.add_argument("--fast", type=int, default=10)
+    parser.add_argument("--slow", type=int, default=21)
+    parser.add_argument("--strike-offset", type=int, default=-200)
+    parser.add_argument("--trail-pct", type=float, default=0.05)
+    parser.add_argument("--candle-minutes", type=int, default=5)
+    args = parser.parse_args()
+    config = StrategyConfig(args.fast, args.slow, args.strike_offset, args.trail_pct, args.candle_minutes)
+
+    ts, prices = load_prices(args.prices, args.token)
+    option_ticks = load_option_ticks(args.options) if args.options else None
+    result = run_backtest(ts, prices, config, lot_size=args.lot_size, fill=FillModel(args.slippage, args.cost),
+                          option_ticks=option_ticks, time_value=args.time_value)
+    for key, value in result.items():
+        print(f"{key:>14}: {value:,.2f}" if isinstance(value, float) else f"{key:>14}: {value:,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import glob
+import os
+import sys
+
+import pytest
+
+from benchmarks.helpers import make_ticks, nfo_rows
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+
+# Session sizes in closed 5-minute candles
+SIZES = (100, 1000, 10000)
+
+STORAGE = os.path.join(HERE, ".benchmarks")
+REGRESSION = "min:25%"
+
+
+def selected(config):
+    # Named on the command line, or pytest was started inside this directory
+    for arg in config.args:
+        path = os.path.abspath(os.path.join(str(config.invocation_params.dir), str(arg).split("::")[0]))
+        if os.path.commonpath([path, HERE]) == HERE:
+            return True
+    return False
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config):
+    # Keep results next to the suite whatever the working directory, and compare
+    # against this machine's latest saved baseline (failing past REGRESSION). A timed
+    # run without one is an error, not a silent pass: record it with `make bench-baseline`.
+    # Only when the suite was asked for: a plain pytest from the root just runs it.
+    if not hasattr(config.option, "benchmark_storage") or not selected(config):
+        return
+    from pytest_benchmark.utils import get_machine_id, parse_compare_fail
+    option = config.option
+    option.benchmark_storage = "file://" + STORAGE
+    if (option.benchmark_compare or option.benchmark_disable or option.benchmark_skip
+            or option.benchmark_save or option.benchmark_autosave):
+        return
+    machine = get_machine_id()
+    baselines = sorted(glob.glob(os.path.join(STORAGE, machine, "*_baseline.json")))
+    if not baselines:
+        raise pytest.UsageError(f"No benchmark baseline for {machine} in {STORAGE}: record one with "
+                                f"`make bench-baseline`, or pass --benchmark-disable to only run the checks")
+    option.benchmark_compare = os.path.basename(baselines[-1]).split("_", 1)[0]
+    if not option.benchmark_compare_fail:
+        option.benchmark_compare_fail = [parse_compare_fail(REGRESSION)]
+
+
+@pytest.fixture(params=SIZES, ids=lambda n: f"{n}c")
+def session_size(request):
+    return request.param
+
+
+@pytest.fixture
+def session_ticks(session_size):
+    return make_ticks(session_size)
+
+
+@pytest.fixture(scope="session")
+def rows():
+    return nfo_rows()
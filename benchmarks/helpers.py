@@ -0,0 +1,41 @@
+import random
+
+# Every closed 5-minute candle is fed TICKS_PER_CANDLE ticks.
+TICKS_PER_CANDLE = 10
+MINUTES = 5
+START_MS = 1704166200000  # 2024-01-02 03:30 UTC, a bucket boundary
+
+
+def make_ticks(n_candles, seed=7, start_ms=START_MS):
+    rng = random.Random(seed)
+    step = MINUTES * 60000 // TICKS_PER_CANDLE
+    price = 21000.0
+    ts, prices = [], []
+    for i in range(n_candles * TICKS_PER_CANDLE):
+        price += rng.gauss(0, 4)
+        ts.append(start_ms + i * step)
+        prices.append(round(price, 2))
+    return ts, prices
+
+
+def make_candles(n_candles, seed=7):
+    ts, prices = make_ticks(n_candles, seed)
+    candles = []
+    for i in range(0, len(ts), TICKS_PER_CANDLE):
+        window = prices[i:i + TICKS_PER_CANDLE]
+        candles.append({'timestamp': ts[i], 'open': window[0], 'high': max(window),
+                        'low': min(window), 'close': window[-1]})
+    return candles
+
+
+def nfo_rows(expiries=20, strikes=2000):
+    # About the size of the NIFTY options slice of the NFO master: 20 x 2000 x 2 = 80k rows.
+    rows = []
+    for e in range(expiries):
+        expiry = f"2024-{1 + e // 4:02d}-{4 + 7 * (e % 4):02d}"
+        for s in range(strikes):
+            strike = 10000.0 + 50 * s
+            for option_type in ('CE', 'PE'):
+                symbol = f"NIFTY{expiry.replace('-', '')}{int(strike)}{option_type}"
+                rows.append([expiry, strike, option_type, str(100000 + len(rows)), symbol])
+    return rows
@@ -0,0 +1,58 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from benchmarks.helpers import MINUTES
+from candles import CandleStore
+from strategy import update_candles_ms
+
+
+def update_candles(candles, ts, price, minutes=5):
+    # The bots' original pd.Timestamp bucketing, kept here for comparison.
+    start = ts - pd.Timedelta(minutes=ts.minute % minutes, seconds=ts.second, microseconds=ts.microsecond)
+    if not candles or candles[-1]['timestamp'] != start:
+        candles.append({"timestamp": start, "open": price, "high": price, "low": price, "close": price})
+    else:
+        c = candles[-1]
+        c['high'] = max(c['high'], price)
+        c['low'] = min(c['low'], price)
+        c['close'] = price
+    return candles
+
+
+def test_update_candles(benchmark, session_ticks, session_size):
+    ts, prices = session_ticks
+    stamps = [pd.Timestamp(t, unit='ms') for t in ts]
+
+    def run():
+        candles = []
+        for t, p in zip(stamps, prices):
+            update_candles(candles, t, p, MINUTES)
+        return candles
+
+    assert len(benchmark(run)) == session_size
+
+
+def test_update_candles_ms(benchmark, session_ticks, session_size):
+    ts, prices = session_ticks
+
+    def run():
+        candles = []
+        for t, p in zip(ts, prices):
+            update_candles_ms(candles, t, p, MINUTES)
+        return candles
+
+    assert len(benchmark(run)) == session_size
+
+
+def test_candle_store_update(benchmark, session_ticks, session_size):
+    ts, prices = session_ticks
+
+    def run():
+        store = CandleStore((1, MINUTES, 15), capacity=session_size)
+        for t, p in zip(ts, prices):
+            store.update("256265", t, p)
+        return store
+
+    assert len(benchmark(run).get("256265", MINUTES)) == session_size
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from chain import OptionChain, call_price, expiry_ms
+
+EXPIRY = "2024-01-04"
+SPOT = 21530.0
+STRIKES = 100
+NOW_MS = expiry_ms(EXPIRY) - 3 * 24 * 60 * 60 * 1000
+
+
+@pytest.fixture
+def chain():
+    chain = OptionChain(EXPIRY, width=STRIKES // 2)
+    strikes = SPOT - SPOT % 50 + 50 * np.arange(-STRIKES // 2, STRIKES // 2)
+    chain.set_contracts([(k, str(i), None) for i, k in enumerate(strikes)])
+    prices, _ = call_price(SPOT, chain.strikes, 3 / 365, chain.rate, 0.12 + 0.00002 * np.abs(chain.strikes - SPOT))
+    for token, price in zip(chain.tokens, np.round(prices, 2)):
+        chain.update(token, NOW_MS, price)
+    return chain
+
+
+def test_chain_cold(benchmark, chain):
+    # First pass: every IV solved from the Brenner-Subrahmanyam guess
+    def run():
+        chain.iv[:] = np.nan
+        return chain.select(SPOT, target_delta=0.35)
+
+    assert benchmark(run) is not None
+
+
+def test_chain_refresh(benchmark, chain):
+    # A few ticks later: Newton starts from the previous IVs
+    chain.analyse(SPOT)
+    rng = np.random.default_rng(3)
+
+    def run():
+        for i in rng.integers(0, STRIKES, 5):
+            chain.update(chain.tokens[i], NOW_MS, chain.ltp[i] + 0.05)
+        return chain.select(SPOT + 5, target_delta=0.35)
+
+    assert benchmark(run) is not None
@@ -0,0 +1,42 @@
+import json
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from decoders import FeedDecoder, SmartStreamDecoder
+
+FRAMES = 1000
+
+
+def json_frames(ticks_per_frame):
+    frames = []
+    for i in range(FRAMES):
+        data = [{'timestamp': 1704166200000 + i * 250, 'lastprice': 21000.05 + j}
+                for j in range(ticks_per_frame)]
+        frames.append(json.dumps({'type': 'm', 'data': data}))
+    return frames
+
+
+@pytest.mark.parametrize("ticks_per_frame", (1, 10))
+def test_decode_json(benchmark, ticks_per_frame):
+    decoder = FeedDecoder("256265")
+    frames = json_frames(ticks_per_frame)
+
+    def run():
+        return [decoder.decode(frame) for frame in frames]
+
+    assert len(benchmark(run)[-1]) == ticks_per_frame
+    assert decoder.errors == 0
+
+
+def test_decode_smartstream(benchmark):
+    decoder = FeedDecoder("256265")
+    header = SmartStreamDecoder.HEADER
+    frames = [header.pack(1, 1, b"26000", i, 1704166200000 + i * 250, 2100005 + i) for i in range(FRAMES)]
+
+    def run():
+        return [decoder.decode(frame) for frame in frames]
+
+    tick = benchmark(run)[0][0]
+    assert (tick.token, tick.ltp) == ("26000", 21000.05)
@@ -0,0 +1,105 @@
+import asyncio
+import random
+from datetime import date
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from benchmarks.helpers import MINUTES, TICKS_PER_CANDLE, make_candles, make_ticks
+from brokers import BrokerAdapter
+from decoders import Tick
+from engine import Engine
+from instruments import InstrumentMaster
+from strategy import StrategyConfig
+
+EXPIRY = "2024-01-04"
+UNDERLYING = "256265"
+ON_TICK_TICKS = 2000
+
+
+class FakeBroker(BrokerAdapter):
+    # Instrument lookups run inline and market orders fill immediately.
+    def __init__(self, instruments):
+        super().__init__(None, instruments, UNDERLYING)
+
+    async def place_order(self, token, symbol, side, quantity, order_type="MARKET", price=0.0, trigger_price=0.0,
+                          tag=None):
+        return {'order_id': '1', 'average_price': 120.0}
+
+
+@pytest.fixture
+def broker(tmp_path, rows):
+    instruments = InstrumentMaster(str(tmp_path / "instruments_nfo"), None)
+    instruments.build(rows)
+    instruments.day = date.today().isoformat()
+    return FakeBroker(instruments)
+
+
+def seeded(broker, tmp_path, session_size):
+    # A fresh engine holding session_size closed candles, as after startup.
+    engine = Engine(broker, EXPIRY, 50, StrategyConfig(candle_minutes=MINUTES), str(tmp_path / "bot_state.json"))
+    engine.candle_store.capacity = max(512, session_size)
+    series = engine.series()
+    series.load(make_candles(session_size + 1))
+    engine.state['candles'] = series.records()
+    engine.indicators.seed(series.records())
+    return engine
+
+
+def test_save_state(benchmark, broker, tmp_path, session_size):
+    engine = seeded(broker, tmp_path, session_size)
+    benchmark(engine.save_state)
+    assert len(engine.load_state()['candles']) == session_size + 1
+
+
+def test_load_state(benchmark, broker, tmp_path, session_size):
+    seeded(broker, tmp_path, session_size).save_state()
+
+    def run():
+        engine = Engine(broker, EXPIRY, 50, StrategyConfig(candle_minutes=MINUTES), str(tmp_path / "bot_state.json"))
+        return engine.load_state()
+
+    assert len(benchmark(run)['candles']) == session_size + 1
+
+
+def test_option_contract(benchmark, broker, rows):
+    loop = asyncio.new_event_loop()
+    rng = random.Random(5)
+    strikes = [rng.choice(rows)[1] for _ in range(1000)]
+
+    async def lookup_all():
+        for strike in strikes:
+            await broker.option_contract(strike, EXPIRY)
+
+    try:
+        benchmark(lambda: loop.run_until_complete(lookup_all()))
+        assert loop.run_until_complete(broker.option_contract(strikes[0], EXPIRY))[0] is not None
+    finally:
+        loop.close()
+
+
+def test_on_tick(benchmark, broker, tmp_path, session_size):
+    loop = asyncio.new_event_loop()
+    start = make_candles(session_size + 1)[-1]['timestamp']
+    ts, prices = make_ticks(ON_TICK_TICKS // TICKS_PER_CANDLE, seed=11, start_ms=start)
+    ticks = [Tick(UNDERLYING, t, p) for t, p in zip(ts, prices)]
+
+    async def feed(engine):
+        for tick in ticks:
+            await engine.on_tick(tick)
+        return engine
+
+    engines = []
+
+    def setup():
+        engines.append(seeded(broker, tmp_path, session_size))
+        return (engines[-1],), {}
+
+    try:
+        engine = benchmark.pedantic(lambda engine: loop.run_until_complete(feed(engine)), setup=setup, rounds=5)
+    finally:
+        for e in engines:
+            e.journal.compact({}, background=False)
+        loop.close()
+    assert engine.state['traded_candle'] is not None
@@ -0,0 +1,35 @@
+import itertools
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+pytest.importorskip("pyarrow")
+
+from benchmarks.helpers import MINUTES
+from history import HistoryStore
+
+
+def test_history_record(benchmark, session_ticks, tmp_path):
+    # Feed-side cost only: the writer thread does the file I/O
+    ts, prices = session_ticks
+    runs = itertools.count()
+
+    def run():
+        store = HistoryStore(str(tmp_path / str(next(runs))), flush_interval=3600)
+        for t, p in zip(ts, prices):
+            store.record("256265", t, p)
+        return store
+
+    store = benchmark(run)
+    store.close()
+    assert store.read_ticks("256265").num_rows == len(ts)
+
+
+def test_history_candles(benchmark, session_ticks, session_size, tmp_path):
+    ts, prices = session_ticks
+    store = HistoryStore(str(tmp_path), batch_size=len(ts) // 10, flush_interval=3600)
+    for t, p in zip(ts, prices):
+        store.record("256265", t, p)
+    store.close()
+
+    assert len(benchmark(store.candles, "256265")) == session_size * MINUTES
@@ -0,0 +1,35 @@
+import pandas as pd
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from benchmarks.helpers import make_candles
+from indicators import MovingAverages
+
+
+def test_moving_averages(benchmark, session_size):
+    candles = make_candles(session_size)
+
+    def run():
+        ma = MovingAverages(10, 21)
+        for c in candles:
+            ma.close_candle(c)
+        return ma
+
+    ma = benchmark(run)
+    df = pd.DataFrame(candles)
+    assert ma.last['ma_fast'] == pytest.approx(df['close'].rolling(10).mean().iloc[-1], abs=1e-9)
+    assert ma.last['ma_slow'] == pytest.approx(df['close'].rolling(21).mean().iloc[-1], abs=1e-9)
+
+
+def test_rolling_frame(benchmark, session_size):
+    # The per-tick DataFrame rebuild the streaming MAs replaced, for comparison.
+    candles = make_candles(session_size)
+
+    def run():
+        df = pd.DataFrame(candles)
+        df['ma_fast'] = df['close'].rolling(10).mean()
+        df['ma_slow'] = df['close'].rolling(21).mean()
+        return df.iloc[-2]
+
+    benchmark(run)
@@ -0,0 +1,27 @@
+import random
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from instruments import InstrumentMaster
+
+
+def test_build_index(benchmark, rows):
+    master = InstrumentMaster("bench", None)
+    benchmark(master.build, rows)
+    assert len(master.index) == len(rows)
+
+
+def test_lookup(benchmark, rows):
+    master = InstrumentMaster("bench", None)
+    master.build(rows)
+    rng = random.Random(3)
+    keys = [rng.choice(rows)[:2] for _ in range(1000)]
+
+    def run():
+        for expiry, strike in keys:
+            master.lookup(strike, expiry, 'CE')
+
+    benchmark(run)
+    assert master.lookup(*reversed(keys[0]), 'CE')[0] is not None
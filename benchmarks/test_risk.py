@@ -0,0 +1,35 @@
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from risk import RiskGate, RiskLimits
+
+NOW_MS = 1704098000000
+LIMITS = RiskLimits(max_daily_loss=5000, max_orders_per_minute=20, max_exposure=50000, max_trades=10,
+                    loss_cooldown_minutes=15)
+
+
+def test_risk_check_entry(benchmark):
+    # Every limit on, a full order-rate window to scan: the cost on each entry
+    gate = RiskGate(LIMITS)
+    gate.check_entry(NOW_MS)
+    for _ in range(19):
+        gate.record_order()
+
+    assert benchmark(gate.check_entry, NOW_MS + 1000, 15000.0) is None
+
+
+def test_risk_limits():
+    gate = RiskGate(LIMITS)
+    assert gate.check_entry(NOW_MS, None) == 'exposure'
+    gate.record_order()
+    gate.opened(15000.0)
+    assert not gate.mark(NOW_MS + 1000, -4000.0)
+    assert gate.closed(-4000.0) is False
+    assert gate.check_entry(NOW_MS + 60000) == 'cooldown'
+    assert gate.mark(NOW_MS + 16 * 60000, -1000.0)
+    assert gate.check_entry(NOW_MS + 16 * 60000) == 'kill_switch'
+    restored = RiskGate(LIMITS)
+    restored.restore(gate.counters())
+    assert restored.check_entry(NOW_MS + 17 * 60000) == 'kill_switch'
+    assert restored.check_entry(NOW_MS + 24 * 60 * 60000) is None
@@ -1,195 +1,107 @@
-import asyncio
-import pandas as pd
-from datetime import datetime, timedelta
-from smartapi import SmartConnect
 import json
 import os
-import websockets
+import re
+from dataclasses import fields, replace
+from smartapi import SmartConnect
+from brokers import SmartConnectBroker, PaperBroker
+from engine import Engine
+from exchange import SimulatedExchange
+from gateway import BrokerGateway
+from instruments import InstrumentMaster, smartapi_rows
+from metrics import REGISTRY
+from risk import RiskGate, RiskLimits
+from runner import StrategyRunner
+from strategy import StrategyConfig
 
 STATE_FILE = "bot_state.json"
-WS_BASE_URL = "wss://marginsocket.angelbroking.com/smart-stream"
-
-def save_state(state):
-    with open(STATE_FILE, "w") as f:
-        json.dump(state, f, default=str)
-
-def load_state():
-    if not os.path.exists(STATE_FILE):
-        return {"candles": [], "position": None, "traded_candle": None}
-    with open(STATE_FILE, "r") as f:
-        data = json.load(f)
-    if data.get("candles"):
-        for c in data["candles"]:
-            c['timestamp'] = pd.to_datetime(c['timestamp'])
-    if data.get("traded_candle"):
-        data["traded_candle"] = pd.to_datetime(data["traded_candle"])
-    return data
-
-def round_strike(price, interval=50):
-    return int(price // interval * interval)
-
-def get_option_instrument_token(strike, expiry_date, client: SmartConnect):
-    try:
-        instruments = client.searchInstruments(exchange="NFO", symbol="NIFTY")
-    except Exception as e:
-        print(f"Error fetching instruments: {e}")
-        return None, None
-    for inst in instruments:
-        if ('expiry' not in inst or 'strikeprice' not in inst or 'optiontype' not in inst):
-            continue
-        if (inst['expiry'].strftime("%Y-%m-%d") == expiry_date and
-                inst['strikeprice'] == strike and
-                inst['optiontype'].upper() == 'CE'):
-            return inst['symboltoken'], inst['tradingsymbol']
-    return None, None
-
-def update_candles(candles, ts, price, minutes=5):
-    start = ts - timedelta(minutes=ts.minute % minutes, seconds=ts.second, microseconds=ts.microsecond)
-    if not candles or candles[-1]['timestamp'] != pd.Timestamp(start):
-        candles.append({"timestamp": pd.Timestamp(start), "open": price, "high": price, "low": price, "close": price})
-    else:
-        c = candles[-1]
-        c['high'] = max(c['high'], price)
-        c['low'] = min(c['low'], price)
-        c['close'] = price
-    return candles
-
-async def on_tick(tick, state, client, expiry_date, lot_size, paper_mode):
-    try:
-        ts = datetime.fromtimestamp(tick['timestamp'] / 1000)
-        ltp = float(tick['lastprice'])
-    except Exception:
-        return
-
-    state['candles'] = update_candles(state.get('candles', []), ts, ltp)
-    save_state(state)
-
-    df = pd.DataFrame(state['candles'])
-    if len(df) < 21:
-        return
-
-    df['ma10'] = df['close'].rolling(10).mean()
-    df['ma21'] = df['close'].rolling(21).mean()
-    last = df.iloc[-2]
-
-    if (last['ma10'] >= last['ma21'] and state.get('traded_candle') != last['timestamp'] and not state.get('position')):
-        strike = round_strike(last['close']) - 200
-        opt_token, opt_symbol = get_option_instrument_token(strike, expiry_date, client)
-        if not opt_token:
-            print("Option instrument not found.")
-            return
-
-        if paper_mode:
-            entry_price = last['close']
-            print(f"[PAPER] Bought {strike} CE @ {entry_price}")
-        else:
-            order_params = {
-                "variety": "NORMAL",
-                "tradingsymbol": opt_symbol,
-                "symboltoken": opt_token,
-                "transactiontype": "BUY",
-                "exchange": "NFO",
-                "ordertype": "MARKET",
-                "producttype": "INTRADAY",
-                "duration": "DAY",
-                "quantity": lot_size
-            }
-            try:
-                order_response = client.placeOrder(order_params)
-                entry_price = order_response['data']['averageprice']
-                print(f"Bought {strike} CE @ {entry_price}")
-            except Exception as e:
-                print(f"Buy failed: {e}")
-                return
-
-        state['position'] = {
-            'option_token': opt_token,
-            'tradingsymbol': opt_symbol,
-            'entry_price': entry_price,
-            'sl_price': entry_price * 0.95,
-            'max_price': entry_price
-        }
-        state['traded_candle'] = last['timestamp']
-        save_state(state)
-
-    if state.get('position'):
-        try:
-            if paper_mode:
-                ltp_opt = state['position']['max_price'] + 1
-            else:
-                quote = client.get_quotes("NFO", state['position']['tradingsymbol'])
-                ltp_opt = float(quote['data'][state['position']['tradingsymbol']]['lastprice'])
-        except Exception:
-            return
-
-        if ltp_opt > state['position']['max_price']:
-            state['position']['max_price'] = ltp_opt
-            state['position']['sl_price'] = max(state['position']['sl_price'], ltp_opt * 0.95)
-            save_state(state)
-
-        if ltp_opt <= state['position']['sl_price']:
-            if paper_mode:
-                exit_price = ltp_opt
-            else:
-                order_params = {
-                    "variety": "NORMAL",
-                    "tradingsymbol": state['position']['tradingsymbol'],
-                    "symboltoken": state['position']['option_token'],
-                    "transactiontype": "SELL",
-                    "exchange": "NFO",
-                    "ordertype": "MARKET",
-                    "producttype": "INTRADAY",
-                    "duration": "DAY",
-                    "quantity": lot_size
-                }
-                try:
-                    sell_order = client.placeOrder(order_params)
-                    exit_price = sell_order['data']['averageprice']
-                except Exception as e:
-                    print(f"Exit failed: {e}")
-                    return
-
-            pnl = (exit_price - state['position']['entry_price']) * lot_size
-            print(f"Trade exited. P&L = {pnl}")
-            state['position'] = None
-            save_state(state)
-
-async def websocket_handler(state, client, expiry_date, lot_size, paper_mode):
-    access_token = client.generateSessionToken()
-    async with websockets.connect(WS_BASE_URL) as websocket:
-        auth_data = {
-            "action": "authenticate",
-            "data": {"apiKey": os.environ['API_KEY'], "accessToken": access_token}
-        }
-        await websocket.send(json.dumps(auth_data))
-        tokens = [256265]
-        sub_data = {
-            "action": "subscribe",
-            "instrumentToken": tokens
-        }
-        await websocket.send(json.dumps(sub_data))
-
-        while True:
-            msg = await websocket.recv()
-            try:
-                message = json.loads(msg)
-                if message.get("type") == "m":
-                    ticks = message.get("data", [])
-                    for tick in ticks:
-                        await on_tick(tick, state, client, expiry_date, lot_size, paper_mode)
-            except Exception as e:
-                print(f"Error in websocket message processing: {e}")
-
-async def main_bot_loop():
-    api_key = os.environ.get("API_KEY")
-    user_id = os.environ.get("USER_ID")
-    password = os.environ.get("PASSWORD")
-    expiry_date = os.environ.get("EXPIRY_DATE")
-    lot_size = int(os.environ.get("LOT_SIZE", 50))
-    paper_mode = os.environ.get("PAPER_MODE", "true").lower() == "true"
-
-    client = SmartConnect(api_key=api_key)
-    client.generateSession(user_id, password)
-
-    state = load_state()
-    await websocket_handler(state, client, expiry_date, lot_size, paper_mode)
+FEED_CAPTURE = os.environ.get("FEED_CAPTURE")  # JSONL path for replay.py
+NIFTY_TOKEN = 256265
+ACCOUNTS_FILE = os.environ.get("ACCOUNTS_FILE")  # JSON: {"name": {"api_key", "user_id", "password", "totp_secret"}}
+FEED_ACCOUNT = os.environ.get("FEED_ACCOUNT", "default")
+HISTORY_DIR = os.environ.get("HISTORY_DIR")  # Arrow tick history, see history.py
+
+
+def history_store():
+    if not HISTORY_DIR:
+        return None
+    from history import HistoryStore
+    return HistoryStore(HISTORY_DIR)
+
+
+runner = None  # made on the bot loop by new_runner(), with its own history store
+engine = None  # the default strategy, for /feed and the queue gauges
+accounts = {}
+
+def _queue():
+    return engine.tick_queue if engine is not None else None
+
+REGISTRY.gauge("bot_tick_queue_depth", "Ticks waiting for the strategy task",
+               lambda: len(_queue()) if _queue() is not None else None)
+REGISTRY.gauge("bot_tick_queue_dropped", "Ticks dropped because the queue was full",
+               lambda: _queue().dropped if _queue() is not None else None)
+REGISTRY.gauge("bot_tick_queue_coalesced", "Ticks merged into a queued tick for the same bucket",
+               lambda: _queue().coalesced if _queue() is not None else None)
+
+def new_runner():
+    global runner, engine
+    runner = StrategyRunner(FEED_CAPTURE, history_store())
+    engine = None
+    return runner
+
+def account_credentials(name):
+    if name == "default":
+        return {"api_key": os.environ.get("API_KEY"), "user_id": os.environ.get("USER_ID"),
+                "password": os.environ.get("PASSWORD"), "totp_secret": os.environ.get("TOTP_SECRET"),
+                "totp": os.environ.get("TOTP")}
+    if not ACCOUNTS_FILE:
+        raise ValueError(f"Unknown account {name}")
+    with open(ACCOUNTS_FILE) as f:
+        credentials = json.load(f)
+    if name not in credentials:
+        raise ValueError(f"Unknown account {name}")
+    return credentials[name]
+
+def account(name="default"):
+    # One live adapter per account; all of them share the NFO instrument master
+    if name not in accounts:
+        creds = account_credentials(name)
+        shared = next(iter(accounts.values())).instruments if accounts else InstrumentMaster("instruments_nfo", smartapi_rows)
+        accounts[name] = SmartConnectBroker(BrokerGateway(SmartConnect(api_key=creds["api_key"])), creds["api_key"],
+                                            creds.get("user_id"), creds.get("password"), underlying=NIFTY_TOKEN,
+                                            instruments=shared, totp_secret=creds.get("totp_secret"),
+                                            totp=creds.get("totp"))
+    return accounts[name]
+
+def build_engine(spec=None):
+    # spec: name, account, expiry_date, lot_size, paper and any StrategyConfig or
+    # RiskLimits field; anything missing falls back to the environment.
+    spec = spec or {}
+    name = spec.get("name", "default")
+    if not re.fullmatch(r"[A-Za-z0-9_-]+", name):
+        raise ValueError(f"Invalid strategy name {name!r}")
+    expiry_date = spec.get("expiry_date") or os.environ.get("EXPIRY_DATE")
+    lot_size = int(spec.get("lot_size") or os.environ.get("LOT_SIZE", 50))
+    paper_mode = spec.get("paper", os.environ.get("PAPER_MODE", "true").lower() == "true")
+    config = replace(StrategyConfig.from_env(), **{f.name: spec[f.name] for f in fields(StrategyConfig) if f.name in spec})
+    limits = replace(RiskLimits.from_env(), **{f.name: spec[f.name] for f in fields(RiskLimits) if f.name in spec})
+
+    broker = account(spec.get("account", "default"))
+    if paper_mode:
+        broker = PaperBroker(broker, exchange=SimulatedExchange.from_env())
+    state_file = STATE_FILE if name == "default" else f"bot_state_{name}.json"
+    return Engine(broker, expiry_date, lot_size, config, state_file, name=name, risk=RiskGate(limits))
+
+async def start_strategy(spec=None):
+    global engine
+    started = await runner.start(build_engine(spec), feed=account(FEED_ACCOUNT))
+    if started.name == "default":
+        engine = started
+    return started
+
+async def main_bot_loop(default=True):
+    # Every strategy runs on this loop and reads the FEED_ACCOUNT socket
+    if runner is None:
+        new_runner()
+    if default:
+        await start_strategy()
+    await runner.run_forever()
@@ -0,0 +1,460 @@
+import asyncio
+import contextlib
+import json
+import os
+from datetime import date, datetime
+
+import websockets
+
+from candles import IST, to_epoch_ms
+from decoders import FeedDecoder, UpstoxTickDecoder
+from exchange import SimulatedExchange
+from instruments import SCRIP_MASTER_TIMEOUT, InstrumentMaster, smartapi_rows, upstox_rows
+from orders import RateLimiter
+
+SMARTSTREAM_URL = os.environ.get("WS_URL", "wss://marginsocket.angelbroking.com/smart-stream")
+# Keepalive pings; a missed pong closes the socket and the engine's supervisor reconnects
+PING_INTERVAL = float(os.environ.get("WS_PING_INTERVAL", 10))
+PING_TIMEOUT = float(os.environ.get("WS_PING_TIMEOUT", 10))
+
+
+class BrokerAdapter:
+    # What the engine needs from a broker: login, a tick feed, quotes, orders,
+    # candle history and the option instrument master. Everything is awaitable;
+    # blocking SDK calls go through the adapter's BrokerGateway thread pool.
+    # Orders return {'order_id', 'average_price'}; average_price is None when the
+    # fill is not known yet. OrderManager then follows the order through the
+    # adapter's order book (reports_orders) or the updates observe() returns
+    # (streams_orders); orders neither can report are filled at the next option tick.
+    # tags_orders: the order book reports each order's client tag, so an order whose
+    # send timed out can be found again. stop_orders: SL-M orders can be placed,
+    # modified and found again by tag.
+    name = "broker"
+    paper = False
+    reports_orders = False
+    streams_orders = False
+    tags_orders = False
+    stop_orders = False
+    order_rate = 10  # order sends per second, shared by every strategy on this adapter
+
+    def __init__(self, gateway, instruments, underlying):
+        self.gateway = gateway
+        self.instruments = instruments
+        self.underlying = str(underlying)
+        self.order_limiter = RateLimiter(self.order_rate) if self.order_rate else None
+
+    @property
+    def client(self):
+        return self.gateway.client if self.gateway is not None else None
+
+    async def _run(self, fn, *args, timeout=None, **kwargs):
+        if self.gateway is None:
+            return fn(*args, **kwargs)
+        return await self.gateway.run(fn, *args, timeout=timeout, **kwargs)
+
+    async def login(self):
+        pass
+
+    def decoder(self):
+        return FeedDecoder(self.underlying)
+
+    def open_feed(self):
+        # Async context manager yielding a feed with recv(), subscribe(tokens), unsubscribe(tokens).
+        raise NotImplementedError
+
+    async def quote(self, token, symbol=None):
+        raise NotImplementedError
+
+    async def place_order(self, token, symbol, side, quantity, order_type="MARKET", price=0.0, trigger_price=0.0,
+                          tag=None):
+        raise NotImplementedError
+
+    async def modify_order(self, order_id, token, symbol, quantity, order_type="MARKET", price=0.0, trigger_price=0.0):
+        # The order's full new terms, as for place_order()
+        raise NotImplementedError
+
+    async def cancel_order(self, order_id, order_type="MARKET"):
+        raise NotImplementedError
+
+    async def order_book(self):
+        # Today's orders as [{'order_id', 'tag', 'status', 'filled', 'average_price'}];
+        # status is 'open' until it is 'complete', 'rejected' or 'cancelled'.
+        return None
+
+    def observe(self, tick):
+        # Called with every feed tick before the engine handles it; returns order
+        # updates (as in order_book()) for adapters that stream them.
+        return ()
+
+    async def history(self, token, minutes, from_ms, to_ms):
+        # [[epoch ms, open, high, low, close], ...] oldest first.
+        return []
+
+    def _contract(self, strike, expiry_date, option_type):
+        try:
+            self.instruments.ensure_loaded(self.gateway)
+        except Exception as e:
+            print(f"Error fetching instruments: {e}")
+            return None, None
+        return self.instruments.lookup(strike, expiry_date, option_type)
+
+    # The first call of the day downloads the whole instrument list
+    async def load_instruments(self):
+        await self._run(self.instruments.ensure_loaded, self.gateway, timeout=SCRIP_MASTER_TIMEOUT)
+
+    async def option_contract(self, strike, expiry_date, option_type='CE'):
+        return await self._run(self._contract, strike, expiry_date, option_type, timeout=SCRIP_MASTER_TIMEOUT)
+
+    async def prefetch(self, spot, expiry_date, option_type='CE'):
+        await self._run(self.instruments.prefetch, self.gateway, spot, expiry_date, option_type,
+                        timeout=SCRIP_MASTER_TIMEOUT)
+
+    def shutdown(self):
+        if self.gateway is not None:
+            self.gateway.shutdown()
+
+
+# --- Angel One SmartConnect ---
+
+HISTORY_INTERVALS = {1: "ONE_MINUTE", 3: "THREE_MINUTE", 5: "FIVE_MINUTE", 10: "TEN_MINUTE",
+                     15: "FIFTEEN_MINUTE", 30: "THIRTY_MINUTE", 60: "ONE_HOUR"}
+
+
+def history_params(token, minutes, from_ms, to_ms):
+    fmt = "%Y-%m-%d %H:%M"
+    return {
+        "exchange": "NSE",
+        "symboltoken": token,
+        "interval": HISTORY_INTERVALS[minutes],
+        "fromdate": datetime.fromtimestamp(from_ms / 1000, IST).strftime(fmt),
+        "todate": datetime.fromtimestamp(to_ms / 1000, IST).strftime(fmt),
+    }
+
+
+class SmartStreamFeed:
+    def __init__(self, websocket):
+        self.websocket = websocket
+
+    async def recv(self):
+        return await self.websocket.recv()
+
+    async def subscribe(self, tokens):
+        await self.websocket.send(json.dumps({"action": "subscribe", "instrumentToken": list(tokens)}))
+
+    async def unsubscribe(self, tokens):
+        await self.websocket.send(json.dumps({"action": "unsubscribe", "instrumentToken": list(tokens)}))
+
+
+ORDER_STATUS = {"complete": "complete", "rejected": "rejected", "cancelled": "cancelled"}
+
+
+class SmartConnectBroker(BrokerAdapter):
+    name = "angelone"
+    reports_orders = True
+    tags_orders = True
+    stop_orders = True
+
+    def __init__(self, gateway, api_key, user_id=None, password=None, underlying=256265,
+                 instruments=None, ws_url=SMARTSTREAM_URL, totp_secret=None, totp=None):
+        super().__init__(gateway, instruments or InstrumentMaster("instruments_nfo", smartapi_rows), underlying)
+        self.api_key = api_key
+        self.user_id = user_id
+        self.password = password
+        self.totp_secret = totp_secret  # base32 secret of the account's authenticator
+        self.totp_code = totp  # a current code instead; good for one login only
+        self.ws_url = ws_url
+        self.token_used = False  # a feed connection was made with the client's current JWT
+
+    def totp(self):
+        if self.totp_secret:
+            import pyotp
+            return pyotp.TOTP(self.totp_secret).now()
+        if self.totp_code:
+            code, self.totp_code = self.totp_code, None
+            return code
+        raise ValueError("Angel One login needs a TOTP: set TOTP_SECRET (or a current TOTP code)")
+
+    async def login(self):
+        if self.user_id:
+            await self.gateway.call("generateSession", self.user_id, self.password, self.totp())
+            self.token_used = False
+
+    async def renew_token(self):
+        # A new JWT from the refresh token, or a new login once that is no good either
+        refresh_token = getattr(self.client, "refresh_token", None)
+        if refresh_token:
+            try:
+                await self.gateway.call("generateToken", refresh_token)
+                self.token_used = False
+                return
+            except Exception as e:
+                print(f"Token refresh failed ({e}); logging in again")
+        await self.login()
+
+    @contextlib.asynccontextmanager
+    async def open_feed(self):
+        # Every reconnect authenticates with a fresh JWT: the one from the last login
+        # expires overnight or with the session, and would fail every retry after
+        if self.token_used:
+            await self.renew_token()
+        self.token_used = True
+        access_token = self.client.access_token  # the JWT generateSession()/generateToken() stored
+        async with websockets.connect(self.ws_url, ping_interval=PING_INTERVAL, ping_timeout=PING_TIMEOUT) as websocket:
+            auth_data = {
+                "action": "authenticate",
+                "data": {"apiKey": self.api_key, "accessToken": access_token}
+            }
+            await websocket.send(json.dumps(auth_data))
+            yield SmartStreamFeed(websocket)
+
+    async def quote(self, token, symbol=None):
+        response = await self.gateway.call("ltpData", "NFO", symbol, token)
+        return float(response['data']['ltp'])
+
+    @staticmethod
+    def order_params(token, symbol, quantity, order_type, price, trigger_price):
+        params = {
+            "variety": "STOPLOSS" if order_type in ("SL", "SL-M") else "NORMAL",
+            "tradingsymbol": symbol,
+            "symboltoken": token,
+            "exchange": "NFO",
+            "ordertype": {"SL": "STOPLOSS_LIMIT", "SL-M": "STOPLOSS_MARKET"}.get(order_type, order_type),
+            "producttype": "INTRADAY",
+            "duration": "DAY",
+            "quantity": quantity
+        }
+        if price:
+            params["price"] = price
+        if trigger_price:
+            params["triggerprice"] = trigger_price
+        return params
+
+    async def place_order(self, token, symbol, side, quantity, order_type="MARKET", price=0.0, trigger_price=0.0,
+                          tag=None):
+        order_params = self.order_params(token, symbol, quantity, order_type, price, trigger_price)
+        order_params["transactiontype"] = side
+        if tag:
+            order_params["ordertag"] = tag
+        response = await self.gateway.place_order(order_params)
+        # SmartConnect.placeOrder answers with the bare order id; the full response
+        # form carries it under data.orderid. The ack never carries a fill.
+        if isinstance(response, str):
+            order_id = response
+        else:
+            order_id = ((response or {}).get('data') or {}).get('orderid')
+        if not order_id:
+            raise RuntimeError(f"placeOrder returned no order id: {response!r}")
+        return {'order_id': order_id, 'average_price': None}
+
+    async def order_book(self):
+        response = await self.gateway.call("orderBook")
+        return [{'order_id': o.get('orderid'), 'tag': o.get('ordertag') or None,
+                 'status': ORDER_STATUS.get(o.get('status'), 'open'),
+                 'filled': int(o.get('filledshares') or 0),
+                 'average_price': float(o.get('averageprice') or 0) or None}
+                for o in (response or {}).get('data') or []]
+
+    async def modify_order(self, order_id, token, symbol, quantity, order_type="MARKET", price=0.0, trigger_price=0.0):
+        params = self.order_params(token, symbol, quantity, order_type, price, trigger_price)
+        params["orderid"] = order_id
+        response = await self.gateway.call("modifyOrder", params)
+        if response and response.get('status') is False:
+            raise RuntimeError(response.get('message') or "modifyOrder rejected")
+        return response
+
+    async def cancel_order(self, order_id, order_type="MARKET"):
+        variety = "STOPLOSS" if order_type in ("SL", "SL-M") else "NORMAL"
+        response = await self.gateway.call("cancelOrder", order_id, variety)
+        if response and response.get('status') is False:
+            raise RuntimeError(response.get('message') or "cancelOrder rejected")
+        return response
+
+    async def history(self, token, minutes, from_ms, to_ms):
+        response = await self.gateway.call("getCandleData", history_params(token, minutes, from_ms, to_ms))
+        return [[to_epoch_ms(ts), o, h, l, c] for ts, o, h, l, c, *_ in (response or {}).get('data') or []]
+
+
+# --- Upstox ---
+
+def upstox_order_type(order_type):
+    from upstox.enums import OrderType
+    return {"MARKET": OrderType.Market, "LIMIT": OrderType.Limit,
+            "SL": OrderType.StopLossLimit, "SL-M": OrderType.StopLossMarket}[order_type]
+
+
+class UpstoxFeed:
+    # Bridges the SDK's callback websocket, which runs on its own thread, onto the loop.
+    def __init__(self, gateway, loop):
+        self.gateway = gateway
+        self.loop = loop
+        self.queue = asyncio.Queue()
+        self.connected = asyncio.Event()
+
+    def on_connect(self):
+        self.loop.call_soon_threadsafe(self.connected.set)
+
+    def on_ticks(self, ticks):
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, ticks)
+
+    def on_disconnect(self):
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, ConnectionError("Upstox feed disconnected"))
+
+    def on_error(self, error):
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, ConnectionError(f"Upstox feed error: {error}"))
+
+    async def recv(self):
+        item = await self.queue.get()
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    async def subscribe(self, tokens):
+        await self.gateway.call("subscribe", list(tokens))
+
+    async def unsubscribe(self, tokens):
+        await self.gateway.call("unsubscribe", list(tokens))
+
+
+class UpstoxBroker(BrokerAdapter):
+    name = "upstox"
+    reports_orders = True
+
+    def __init__(self, gateway, underlying, instruments=None, connect_timeout=15.0):
+        super().__init__(gateway, instruments or InstrumentMaster("instruments_nfo_upstox", upstox_rows), underlying)
+        self.connect_timeout = connect_timeout
+
+    def decoder(self):
+        return UpstoxTickDecoder(self.underlying)
+
+    @contextlib.asynccontextmanager
+    async def open_feed(self):
+        from upstox.enums import MarketFeedType
+        feed = UpstoxFeed(self.gateway, asyncio.get_running_loop())
+        await self.gateway.call("start_websocket", feed.on_ticks, MarketFeedType.Full,
+                                on_connect=feed.on_connect, on_disconnect=feed.on_disconnect,
+                                on_error=feed.on_error)
+        try:
+            await asyncio.wait_for(feed.connected.wait(), self.connect_timeout)
+            yield feed
+        finally:
+            if hasattr(self.client, "stop_websocket"):
+                await self.gateway.call("stop_websocket")
+
+    async def quote(self, token, symbol=None):
+        from upstox.enums import LiveFeedType
+        response = await self.gateway.call("get_live_feed", token, LiveFeedType.LTP)
+        return float(response['ltp'])
+
+    async def place_order(self, token, symbol, side, quantity, order_type="MARKET", price=0.0, trigger_price=0.0,
+                          tag=None):
+        # The Upstox SDK has no client order tag; duplicates are caught by OrderManager alone
+        from upstox.enums import ProductType, TransactionType
+        order = await self.gateway.call(
+            "place_order",
+            token,
+            quantity=quantity,
+            order_type=upstox_order_type(order_type),
+            product_type=ProductType.Intraday,
+            transaction_type=TransactionType.Buy if side == "BUY" else TransactionType.Sell,
+            price=price,
+            trigger_price=trigger_price
+        )
+        return {'order_id': order.get('order_id'), 'average_price': None}
+
+    async def order_book(self):
+        orders = await self.gateway.call("get_order_history")
+        return [{'order_id': o.get('order_id'), 'tag': o.get('tag'),
+                 'status': ORDER_STATUS.get(str(o.get('status')).lower(), 'open'),
+                 'filled': int(o.get('traded_quantity') or 0),
+                 'average_price': float(o.get('average_price') or 0) or None}
+                for o in orders or []]
+
+    async def modify_order(self, order_id, token, symbol, quantity, order_type="MARKET", price=0.0, trigger_price=0.0):
+        return await self.gateway.call("modify_order", order_id, quantity=quantity,
+                                       order_type=upstox_order_type(order_type), price=price,
+                                       trigger_price=trigger_price)
+
+    async def cancel_order(self, order_id, order_type="MARKET"):
+        return await self.gateway.call("cancel_order", order_id)
+
+    async def history(self, token, minutes, from_ms, to_ms):
+        from upstox.enums import OHLCInterval
+        intervals = {1: OHLCInterval.Minute_1, 5: OHLCInterval.Minute_5, 10: OHLCInterval.Minute_10,
+                     30: OHLCInterval.Minute_30, 60: OHLCInterval.Minute_60}
+        start = datetime.fromtimestamp(from_ms / 1000, IST).date()
+        end = datetime.fromtimestamp(to_ms / 1000, IST).date()
+        bars = await self.gateway.call("get_ohlc", token, intervals[minutes], start, end)
+        rows = [[to_epoch_ms(int(b['timestamp'])), float(b['open']), float(b['high']),
+                 float(b['low']), float(b['close'])] for b in bars or []]
+        return [r for r in rows if from_ms <= r[0] <= to_ms]
+
+
+# --- Paper trading ---
+
+class PaperBroker(BrokerAdapter):
+    # Orders go to a SimulatedExchange fed by the same ticks as the engine and never
+    # reach the broker. Feed, quotes, history and instruments come from `source`
+    # (a live adapter) when there is one.
+    name = "paper"
+    paper = True
+    reports_orders = True
+    streams_orders = True
+    tags_orders = True
+    stop_orders = True
+    order_rate = None
+
+    def __init__(self, source=None, instruments=None, underlying=None, exchange=None):
+        super().__init__(source.gateway if source else None,
+                         instruments or (source.instruments if source else InstrumentMaster("instruments_paper", None)),
+                         underlying if underlying is not None else source.underlying)
+        self.source = source
+        self.exchange = exchange or SimulatedExchange()
+        if source is None:
+            self.instruments.day = date.today().isoformat()  # nothing to fetch; rows come from build()
+
+    async def login(self):
+        if self.source is not None:
+            await self.source.login()
+
+    def decoder(self):
+        return self.source.decoder() if self.source else super().decoder()
+
+    def open_feed(self):
+        if self.source is None:
+            raise ConnectionError("Paper broker has no feed source")
+        return self.source.open_feed()
+
+    async def quote(self, token, symbol=None):
+        if self.source is not None:
+            return await self.source.quote(token, symbol)
+        # Offline: the last price the simulated exchange has seen
+        ltp = self.exchange.prices.get(str(token))
+        if ltp is None:
+            raise LookupError(f"No price for {token} yet")
+        return ltp
+
+    async def history(self, token, minutes, from_ms, to_ms):
+        return await self.source.history(token, minutes, from_ms, to_ms) if self.source else []
+
+    def observe(self, tick):
+        return [self._update(order) for order in self.exchange.on_tick(tick.token, tick.ts_ms, tick.ltp)]
+
+    def _update(self, order):
+        return {'order_id': order['order_id'], 'tag': order.get('tag'), 'status': order['status'],
+                'filled': order['filled'], 'average_price': order['average_price']}
+
+    async def place_order(self, token, symbol, side, quantity, order_type="MARKET", price=0.0, trigger_price=0.0,
+                          tag=None):
+        order = self.exchange.submit(token, side, quantity, order_type, price, trigger_price)
+        order.update(symbol=symbol, tag=tag)
+        return {'order_id': order['order_id'], 'average_price': None}
+
+    async def modify_order(self, order_id, token, symbol, quantity, order_type="MARKET", price=0.0, trigger_price=0.0):
+        order = self.exchange.modify(order_id, quantity=quantity, price=price, trigger_price=trigger_price)
+        return {'order_id': order['order_id']}
+
+    async def cancel_order(self, order_id, order_type="MARKET"):
+        return {'order_id': self.exchange.cancel(order_id)['order_id']}
+
+    async def order_book(self):
+        return [self._update(order) for order in self.exchange.orders.values()]
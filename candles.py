@@ -0,0 +1,147 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+IST = timezone(timedelta(hours=5, minutes=30))  # the exchange clock: sessions and trading days
+
+
+def to_epoch_ms(value):
+    # Candle timestamps are epoch-ms ints; older state files stored local-time strings.
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return int(value.timestamp() * 1000)
+
+
+class CandleSeries:
+    # OHLC bars for one token and timeframe. Closed bars live in preallocated
+    # numpy ring buffers; the forming bar is a dict updated in place.
+    def __init__(self, minutes, capacity=512):
+        self.minutes = minutes
+        self.bucket_ms = minutes * 60000
+        self.capacity = capacity
+        self.starts = np.zeros(capacity, dtype=np.int64)
+        self.ohlc = np.zeros((capacity, 4), dtype=np.float64)
+        self.closed = 0
+        self.closed_until = 0  # end of the last closed bar
+        self.bar = None
+
+    def __len__(self):
+        return min(self.closed, self.capacity) + (self.bar is not None)
+
+    def update(self, ts_ms, price):
+        # Returns the bar that just closed, if this tick opened a new one.
+        start = ts_ms - ts_ms % self.bucket_ms
+        bar = self.bar
+        if bar is not None and bar['timestamp'] == start:
+            if price > bar['high']:
+                bar['high'] = price
+            elif price < bar['low']:
+                bar['low'] = price
+            bar['close'] = price
+            return None
+        if start < self.closed_until or (bar is not None and start < bar['timestamp']):
+            return None  # late tick for a bar that has already closed
+        closed = self.close_bar()
+        self.bar = {'timestamp': start, 'open': price, 'high': price, 'low': price, 'close': price}
+        return closed
+
+    def close_bar(self):
+        bar = self.bar
+        if bar is None:
+            return None
+        i = self.closed % self.capacity
+        self.starts[i] = bar['timestamp']
+        self.ohlc[i] = (bar['open'], bar['high'], bar['low'], bar['close'])
+        self.closed += 1
+        self.closed_until = bar['timestamp'] + self.bucket_ms
+        self.bar = None
+        return bar
+
+    def close_at(self, boundary_ms):
+        # Close the forming bar if it ended by this boundary, at most one bar ago. Bars
+        # on another clock (a replayed feed) are left for their next tick to close.
+        bar = self.bar
+        if bar is not None and boundary_ms - self.bucket_ms < bar['timestamp'] + self.bucket_ms <= boundary_ms:
+            return self.close_bar()
+        return None
+
+    def resume_ms(self):
+        # Start of the bar the next tick builds on: the forming one, or the one after the last close
+        return self.bar['timestamp'] if self.bar is not None else self.closed_until
+
+    def _order(self):
+        n = min(self.closed, self.capacity)
+        first = self.closed - n
+        return (np.arange(first, self.closed) % self.capacity) if n else np.empty(0, dtype=np.int64)
+
+    def closes(self):
+        return self.ohlc[self._order(), 3]
+
+    def last_closed(self):
+        if not self.closed:
+            return None
+        i = (self.closed - 1) % self.capacity
+        o, h, l, c = self.ohlc[i].tolist()
+        return {'timestamp': int(self.starts[i]), 'open': o, 'high': h, 'low': l, 'close': c}
+
+    def records(self, limit=None):
+        idx = self._order()
+        if limit is not None:
+            idx = idx[-limit:]
+        out = [
+            {'timestamp': int(ts), 'open': o, 'high': h, 'low': l, 'close': c}
+            for ts, (o, h, l, c) in zip(self.starts[idx].tolist(), self.ohlc[idx].tolist())
+        ]
+        if self.bar is not None:
+            out.append(dict(self.bar))
+        return out
+
+    def load(self, records):
+        # Every record but the last is closed; the last becomes the forming bar.
+        for r in records:
+            self.close_bar()
+            self.bar = {'timestamp': to_epoch_ms(r['timestamp']), 'open': r['open'],
+                        'high': r['high'], 'low': r['low'], 'close': r['close']}
+
+
+class CandleStore:
+    # Candle series per (instrument token, timeframe), bucketed on epoch-ms ints.
+    def __init__(self, timeframes=(1, 5, 15), capacity=512):
+        self.timeframes = tuple(sorted(set(timeframes)))
+        self.capacity = capacity
+        self.series = {}
+
+    def _series_for(self, token):
+        series = self.series.get(token)
+        if series is None:
+            series = self.series[token] = {m: CandleSeries(m, self.capacity) for m in self.timeframes}
+        return series
+
+    def get(self, token, minutes):
+        return self._series_for(token)[minutes]
+
+    def update(self, token, ts_ms, price):
+        # Returns {minutes: closed bar} for every timeframe whose bar just closed.
+        closed = {}
+        for minutes, series in self._series_for(token).items():
+            bar = series.update(ts_ms, price)
+            if bar is not None:
+                closed[minutes] = bar
+        return closed
+
+    def close_at(self, token, boundary_ms):
+        # {minutes: closed bar} for every timeframe whose forming bar ended by the boundary
+        closed = {}
+        for minutes, series in self._series_for(token).items():
+            bar = series.close_at(boundary_ms)
+            if bar is not None:
+                closed[minutes] = bar
+        return closed
+
+    def drop(self, token):
+        self.series.pop(token, None)
+
+    def tokens(self):
+        return list(self.series)
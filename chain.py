@@ -0,0 +1,162 @@
+import math
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+
+from candles import IST
+from metrics import REGISTRY
+
+ANALYSE = REGISTRY.histogram("bot_option_chain_seconds", "IV and Greeks for the whole option chain",
+                             (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025))
+
+RATE = float(os.environ.get("RISK_FREE_RATE", 0.07))
+WIDTH = int(os.environ.get("CHAIN_WIDTH", 20))  # strikes each side of the money
+YEAR_MS = 365 * 24 * 60 * 60 * 1000
+SQRT_2PI = math.sqrt(2 * math.pi)
+
+
+def norm_pdf(x):
+    return np.exp(-0.5 * x * x) / SQRT_2PI
+
+
+def norm_cdf(x):
+    # Abramowitz & Stegun 7.1.26 (|error| < 1.5e-7), so no scipy on the signal path
+    z = np.abs(x) / math.sqrt(2)
+    t = 1.0 / (1.0 + 0.3275911 * z)
+    poly = t * (0.254829592 + t * (-0.284496736 + t * (1.421413741 + t * (-1.453152027 + t * 1.061405429))))
+    erf = 1.0 - poly * np.exp(-z * z)
+    return 0.5 * (1.0 + np.sign(x) * erf)
+
+
+def call_price(spot, strikes, years, rate, sigma):
+    # Black-Scholes call price and vega
+    root = np.sqrt(years)
+    d1 = (np.log(spot / strikes) + (rate + 0.5 * sigma * sigma) * years) / (sigma * root)
+    d2 = d1 - sigma * root
+    price = spot * norm_cdf(d1) - strikes * math.exp(-rate * years) * norm_cdf(d2)
+    return price, spot * norm_pdf(d1) * root
+
+
+def implied_vol(prices, spot, strikes, years, rate, guess=None, iterations=20, tol=1e-4):
+    # Newton on every strike at once, falling back to bisection inside the bracket
+    # when a step would leave it. NaN where the price is outside no-arbitrage bounds.
+    n = len(strikes)
+    valid = np.isfinite(prices) & (prices > np.maximum(spot - strikes * math.exp(-rate * years), 0.0)) & \
+        (prices < spot) & (years > 0)
+    if not valid.any():
+        return np.full(n, np.nan)
+    if guess is None:
+        guess = np.full(n, np.nan)
+    # Brenner-Subrahmanyam where there is no previous IV to start from
+    start = np.sqrt(2 * math.pi / max(years, 1e-9)) * prices / spot
+    sigma = np.clip(np.where(np.isfinite(guess), guess, start), 0.01, 3.0)
+    sigma = np.where(valid, sigma, 0.2)
+    lo = np.full(n, 1e-4)
+    hi = np.full(n, 5.0)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        for _ in range(iterations):
+            price, vega = call_price(spot, strikes, years, rate, sigma)
+            diff = price - prices
+            done = ~valid | (np.abs(diff) < tol)
+            if done.all():
+                break
+            hi = np.where(diff > 0, sigma, hi)
+            lo = np.where(diff <= 0, sigma, lo)
+            step = sigma - diff / vega
+            inside = (step > lo) & (step < hi)
+            sigma = np.where(done, sigma, np.where(inside, step, 0.5 * (lo + hi)))
+    return np.where(valid, sigma, np.nan)
+
+
+def call_greeks(spot, strikes, years, rate, sigma):
+    # Delta, gamma, vega (per 1.00 of vol) and theta (per calendar day)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        root = np.sqrt(years)
+        d1 = (np.log(spot / strikes) + (rate + 0.5 * sigma * sigma) * years) / (sigma * root)
+        d2 = d1 - sigma * root
+        pdf = norm_pdf(d1)
+        discounted = strikes * math.exp(-rate * years)
+        return {
+            'delta': norm_cdf(d1),
+            'gamma': pdf / (spot * sigma * root),
+            'vega': spot * pdf * root,
+            'theta': (-spot * pdf * sigma / (2 * root) - rate * discounted * norm_cdf(d2)) / 365,
+        }
+
+
+def expiry_ms(expiry_date):
+    # Index options expire at the 15:30 IST close
+    day = datetime.strptime(expiry_date, "%Y-%m-%d")
+    return int(day.replace(hour=15, minute=30, tzinfo=IST).timestamp() * 1000)
+
+
+class OptionChain:
+    # The calls of one expiry around the money: live LTPs by feed token, with IV and
+    # Greeks for the whole chain in one vectorized pass. Each pass starts Newton from
+    # the previous IVs, so a refresh after a few ticks settles in one or two steps.
+    def __init__(self, expiry_date, width=WIDTH, rate=RATE):
+        self.expiry_ms = expiry_ms(expiry_date)
+        self.width = width
+        self.rate = rate
+        self.strikes = np.empty(0)
+        self.ltp = np.empty(0)
+        self.iv = np.empty(0)
+        self.tokens = []
+        self.index = {}
+        self.clock = None  # latest option tick time, so a replay prices on its own clock
+        self.version = 0
+
+    def set_contracts(self, contracts):
+        # [(strike, token, symbol), ...]; quotes and IVs carry over for contracts that stay
+        contracts = sorted((float(strike), str(token)) for strike, token, _ in contracts if token)
+        tokens = [token for _, token in contracts]
+        if tokens == self.tokens:
+            return False
+        ltp = np.full(len(tokens), np.nan)
+        iv = np.full(len(tokens), np.nan)
+        for i, token in enumerate(tokens):
+            j = self.index.get(token)
+            if j is not None:
+                ltp[i] = self.ltp[j]
+                iv[i] = self.iv[j]
+        self.strikes = np.array([strike for strike, _ in contracts])
+        self.ltp, self.iv, self.tokens = ltp, iv, tokens
+        self.index = {token: i for i, token in enumerate(tokens)}
+        self.version += 1
+        return True
+
+    def update(self, token, ts_ms, ltp):
+        i = self.index.get(token)
+        if i is not None:
+            self.ltp[i] = ltp
+            if self.clock is None or ts_ms > self.clock:
+                self.clock = ts_ms
+
+    def analyse(self, spot, now_ms=None):
+        # {'strike', 'ltp', 'iv', 'delta', 'gamma', 'vega', 'theta'} arrays; NaN where a strike has no usable quote
+        started = time.perf_counter()
+        now_ms = now_ms or self.clock or time.time() * 1000
+        years = max(self.expiry_ms - now_ms, 0) / YEAR_MS
+        self.iv = implied_vol(self.ltp, spot, self.strikes, years, self.rate, self.iv)
+        greeks = call_greeks(spot, self.strikes, years, self.rate, self.iv)
+        ANALYSE.since(started)
+        return {'strike': self.strikes, 'ltp': self.ltp, 'iv': self.iv, **greeks}
+
+    def select(self, spot, target_delta=0.0, premium_min=0.0, premium_max=0.0, now_ms=None):
+        # The strike nearest target_delta among calls priced inside the premium band
+        # (when one is set); with only a band, the one nearest its middle. None without quotes.
+        chain = self.analyse(spot, now_ms)
+        usable = np.isfinite(chain['delta'])
+        if premium_max:
+            usable &= (chain['ltp'] >= premium_min) & (chain['ltp'] <= premium_max)
+        if not usable.any():
+            return None
+        if target_delta:
+            distance = np.abs(chain['delta'] - target_delta)
+        else:
+            distance = np.abs(chain['ltp'] - (premium_min + premium_max) / 2)
+        candidates = np.flatnonzero(usable)
+        strike = float(self.strikes[candidates[np.argmin(distance[candidates])]])
+        return int(strike) if strike.is_integer() else strike
@@ -0,0 +1,56 @@
+import time
+
+import pandas as pd
+import streamlit as st
+
+from snapshot import read_snapshot, running
+
+POLL_SECONDS = 1.0
+
+
+def render(name):
+    # Draw the latest snapshot from the engine process; False when none is running.
+    # A process that died without cleaning up leaves its last snapshot behind: that
+    # is shown as crashed, and not polled.
+    data = read_snapshot(name)
+    if data is None:
+        st.info("Bot not running.")
+        return False
+    alive = running(name)
+    status = data['status'] if alive else "crashed"
+
+    prefix = "[PAPER] " if data['paper'] else ""
+    st.caption(f"{prefix}{data['broker']} · {status} · pid {data['pid']} · "
+               f"updated {time.time() - data['updated']:.0f}s ago")
+    if not alive:
+        st.error(f"Bot process {data['pid']} is gone; showing its last snapshot. Start it again to resume.")
+
+    position = data['position']
+    cols = st.columns(3)
+    cols[0].metric("Realized P&L", f"{data['realized_pnl']:.2f}", f"{data['trades']} trades")
+    cols[1].metric("Open P&L", f"{data['open_pnl']:.2f}" if data['open_pnl'] is not None else "-")
+    if position:
+        cols[2].metric("Position", position.get('tradingsymbol') or position['option_token'],
+                       f"SL {position['sl_price']:.2f}" if position.get('sl_price') else "filling")
+    else:
+        cols[2].metric("Position", "Flat")
+
+    if data['candles']:
+        df = pd.DataFrame(data['candles'])
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms', utc=True).dt.tz_convert('Asia/Kolkata')
+        st.line_chart(df.set_index('timestamp')['close'])
+    if data['indicators']:
+        last = data['indicators']
+        st.write(f"{data['candle_minutes']}m close {last['close']} · fast MA {last['ma_fast']} · slow MA {last['ma_slow']}")
+
+    boxes = {"warning": st.warning, "error": st.error, "pnl": st.success}
+    for event in reversed(data['events'][-10:]):
+        boxes.get(event['kind'], st.write)(event['message'])
+    return alive
+
+
+def poll(name):
+    # Rerun the page every POLL_SECONDS while the engine is publishing
+    if render(name):
+        time.sleep(POLL_SECONDS)
+        st.rerun()
@@ -0,0 +1,111 @@
+import json
+import struct
+
+try:
+    import orjson
+    loads = orjson.loads
+except ImportError:
+    loads = json.loads
+
+
+class Tick:
+    # One decoded price update: instrument token (str), epoch-ms timestamp (int), LTP (float).
+    __slots__ = ('token', 'ts_ms', 'ltp')
+
+    def __init__(self, token, ts_ms, ltp):
+        self.token = token
+        self.ts_ms = ts_ms
+        self.ltp = ltp
+
+    def __repr__(self):
+        return f"Tick({self.token!r}, {self.ts_ms}, {self.ltp})"
+
+
+class SmartStreamDecoder:
+    # SmartStream binary packets: mode, exchange type, 25-byte token, sequence number,
+    # exchange timestamp (epoch ms) and LTP in paise, little-endian. LTP, quote and
+    # snap-quote packets all share this 51-byte prefix; the rest is ignored.
+    HEADER = struct.Struct('<BB25sqqq')
+
+    def decode(self, frame):
+        if len(frame) < self.HEADER.size:
+            raise ValueError(f"short SmartStream packet ({len(frame)} bytes)")
+        _, _, token, _, ts_ms, ltp = self.HEADER.unpack_from(frame)
+        return [Tick(token.split(b'\0', 1)[0].decode(), ts_ms, ltp / 100.0)]
+
+
+class ProtobufDecoder:
+    # Upstox market-data feed. Needs the module generated from MarketDataFeed.proto
+    # (protoc --python_out); FeedResponse.feeds maps instrument key -> Feed, whose
+    # LTPC carries ltp and ltt (epoch ms) either directly or under the full feed.
+    def __init__(self, module=None):
+        if module is None:
+            import MarketDataFeed_pb2 as module
+        self.response = module.FeedResponse
+
+    @staticmethod
+    def _ltpc(feed):
+        kind = feed.WhichOneof('FeedUnion')
+        if kind == 'ltpc':
+            return feed.ltpc
+        if kind == 'ff':
+            full = feed.ff
+            return getattr(full, full.WhichOneof('FullFeedUnion')).ltpc
+        return None
+
+    def decode(self, frame):
+        response = self.response()
+        response.ParseFromString(frame)
+        ticks = []
+        for key, feed in response.feeds.items():
+            ltpc = self._ltpc(feed)
+            if ltpc is not None and ltpc.ltt:
+                ticks.append(Tick(key, ltpc.ltt, ltpc.ltp))
+        return ticks
+
+
+class FeedDecoder:
+    # Turns raw feed frames into Ticks. Text frames are the JSON {"type": "m", "data": [...]}
+    # messages; binary frames go to `binary` (SmartStream by default). Malformed ticks
+    # are skipped and counted in `errors`.
+    def __init__(self, default_token, binary=None):
+        self.default_token = default_token
+        self.binary = binary if binary is not None else SmartStreamDecoder()
+        self.errors = 0
+
+    def decode(self, frame):
+        if isinstance(frame, (bytes, bytearray)):
+            try:
+                return self.binary.decode(frame)
+            except Exception:
+                self.errors += 1
+                return []
+        message = loads(frame)
+        if message.get("type") != "m":
+            return []
+        ticks = []
+        default = self.default_token
+        for raw in message.get("data", ()):
+            try:
+                token = raw.get('instrumentToken') or raw.get('token') or default
+                ticks.append(Tick(str(token), int(raw['timestamp']), float(raw['lastprice'])))
+            except Exception:
+                self.errors += 1
+        return ticks
+
+
+class UpstoxTickDecoder:
+    # Tick dicts from the Upstox SDK callback (instrument_token, timestamp, last_price).
+    def __init__(self, default_token):
+        self.default_token = default_token
+        self.errors = 0
+
+    def decode(self, frame):
+        ticks = []
+        for raw in frame:
+            try:
+                token = raw.get('instrument_token') or self.default_token
+                ticks.append(Tick(str(token), int(raw['timestamp']), float(raw['last_price'])))
+            except Exception:
+                self.errors += 1
+        return ticks
@@ -0,0 +1,594 @@
+import asyncio
+import math
+import os
+import time
+from datetime import datetime
+
+from candles import IST, CandleStore, to_epoch_ms
+from chain import OptionChain
+from feed import TickQueue
+from hub import FeedHub
+from indicators import MovingAverages
+from journal import StateJournal
+from metrics import REGISTRY
+from orders import FINAL, OrderManager, order_tag
+from risk import REASONS, RiskGate
+from scheduler import BarClock, BarClose
+from strategy import (StrategyConfig, entry_signal, entry_strike, new_position,
+                      fill_position, stop_trigger, trail_position)
+from warmup import CandleCache
+
+TICKS = REGISTRY.counter("bot_ticks_total", "Ticks processed by the strategy task")
+SIGNALS = REGISTRY.counter("bot_signals_total", "Entry signals raised")
+ORDERS = REGISTRY.counter("bot_orders_total", "Orders sent to the broker")
+ERRORS = REGISTRY.counter("bot_errors_total", "Errors on the tick path")
+TICK_TO_CANDLE = REGISTRY.histogram("bot_tick_to_candle_seconds", "Feed receive to candle update")
+TICK_TO_SIGNAL = REGISTRY.histogram("bot_tick_to_signal_seconds", "Feed receive to signal evaluated")
+ON_TICK = REGISTRY.histogram("bot_on_tick_seconds", "Time spent handling one tick")
+SAVE_STATE = REGISTRY.histogram("bot_save_state_seconds", "Time spent persisting state on the tick path")
+BACKFILLED = REGISTRY.counter("bot_backfilled_candles_total", "1-minute candles filled from history after a gap")
+BAR_CLOSES = REGISTRY.counter("bot_bar_closes_total", "Strategy bars closed, by the next tick or the bar clock")
+WARMED = REGISTRY.counter("bot_warmup_candles_total", "1-minute candles replayed from history at startup")
+RISK_REJECTS = REGISTRY.counter("bot_risk_rejects_total", "Entries refused by the risk gate")
+RISK_KILLS = REGISTRY.counter("bot_risk_kills_total", "Kill switch trips on the daily loss limit")
+
+STOP_ORDERS = os.environ.get("STOP_ORDERS", "1") != "0"  # trail a stop order at the broker where the adapter can
+
+
+def print_notice(kind, message):
+    print(message)
+
+
+class Engine:
+    # The MA-crossover strategy for one broker adapter: candle store, MAs, state
+    # journal and orders. Ticks arrive through a FeedHub, either its own (run()) or
+    # one shared with other strategies (runner.py). The Streamlit pages only build a
+    # broker and call run(). notify(kind, message) reports "info", "trade", "pnl",
+    # "warning" and "error" events to the front-end. Every entry passes the risk
+    # gate first; its kill switch flattens the position.
+    def __init__(self, broker, expiry_date, lot_size=50, config=None, state_file="bot_state.json",
+                 notify=None, capture=None, name="default", history=None, candle_cache=None, risk=None):
+        self.name = name
+        self.broker = broker
+        self.expiry_date = expiry_date
+        self.lot_size = lot_size
+        self.config = config or StrategyConfig.from_env()
+        self.journal = StateJournal(state_file)
+        self.candle_store = CandleStore((1, self.config.candle_minutes, 15))
+        self.indicators = MovingAverages(self.config.fast, self.config.slow)
+        self.state = {'candles': [], 'position': None, 'traded_candle': None, 'risk': None}
+        self.realized_pnl = 0.0  # this session's closed trades
+        self.trades = 0
+        self.notify = notify or print_notice
+        self.capture = capture
+        self.history = history
+        self.candle_cache = candle_cache or CandleCache.from_env()
+        self.tick_queue = None
+        self.orders = OrderManager(broker, self.on_order_final)
+        self.stop_orders = STOP_ORDERS and broker.stop_orders
+        self.chain = OptionChain(expiry_date) if self.config.uses_chain else None
+        self.risk = risk or RiskGate()
+
+    @property
+    def underlying(self):
+        return self.broker.underlying
+
+    def series(self):
+        return self.candle_store.get(self.underlying, self.config.candle_minutes)
+
+    # --- State ---
+
+    def save_state(self):
+        self.state['candles'] = self.series().records()
+        self.state['risk'] = self.risk.counters()
+        self.journal.compact(self.state, background=False)
+
+    def load_state(self):
+        data = self.journal.load()
+        for c in data.get("candles") or []:
+            c['timestamp'] = to_epoch_ms(c['timestamp'])
+        if data.get("traded_candle"):
+            data["traded_candle"] = to_epoch_ms(data["traded_candle"])
+        position = data.get('position')
+        if position and 'option_id' in position:
+            # Older Upstox state files keyed the held option as option_id
+            position['option_token'] = position.pop('option_id')
+            position.setdefault('tradingsymbol', None)
+        self.state = {'candles': data.get('candles') or [], 'position': data.get('position'),
+                      'traded_candle': data.get('traded_candle'), 'risk': data.get('risk')}
+        self.risk.restore(self.state['risk'])
+        series = self.series()
+        series.load(self.state['candles'])
+        self.indicators.seed(series.records())
+        return self.state
+
+    def persist_candle(self, candle):
+        # Closed bars only; after a crash warm_up() rebuilds the forming one from history
+        started = time.perf_counter()
+        self.journal.append_candle(candle)
+        if self.journal.due():
+            self.state['candles'] = self.series().records()
+            self.journal.compact(self.state)
+        SAVE_STATE.since(started)
+
+    def persist_risk(self):
+        self.state['risk'] = self.risk.counters()
+        self.journal.append_risk(self.state['risk'])
+
+    # --- Candles ---
+
+    def update_underlying(self, ts_ms, prices):
+        # Feed prices into the candle store; closed strategy-timeframe bars advance the
+        # MAs. Returns the strategy bar that closed, if any.
+        closed_bar = None
+        for price in prices:
+            closed = self.candle_store.update(self.underlying, ts_ms, price).get(self.config.candle_minutes)
+            if closed is not None:
+                self.indicators.close_candle(closed)
+                closed_bar = closed
+        return closed_bar
+
+    def replay_bars(self, bars, since):
+        # Finest-timeframe history bars from `since` on, as ticks on the same intra-bar
+        # path as the backtester: low first on up bars, high first on down bars.
+        filled = 0
+        for ts_ms, o, h, l, c in bars:
+            if ts_ms < since:
+                continue
+            prices = (o, l, h, c) if c >= o else (o, h, l, c)
+            self.update_underlying(ts_ms, [float(p) for p in prices])
+            filled += 1
+        return filled
+
+    async def warm_up(self, history=None):
+        # Before the feed is subscribed: replay the last few days of bars (cached per
+        # day on disk, or read from the tick history) after the saved candles, so the
+        # MAs are ready at the first tick instead of `slow` candles into the session.
+        if not self.candle_cache.days:
+            return 0
+        finest = self.candle_store.get(self.underlying, self.candle_store.timeframes[0])
+        resume = self.series().resume_ms()
+        try:
+            bars = await self.candle_cache.recent(self.broker, self.underlying, finest.minutes, int(time.time() * 1000),
+                                                  history or self.history)
+        except Exception as e:
+            ERRORS.inc(stage="warmup", strategy=self.name)
+            self.notify("error", f"Warm-up failed: {e}")
+            return 0
+        filled = self.replay_bars(bars, resume)
+        if filled:
+            WARMED.inc(filled)
+            self.save_state()
+            ready = "ready" if self.indicators.ready else "not ready yet"
+            self.notify("info", f"Warmed up from {filled} history candles; moving averages {ready}")
+        return filled
+
+    async def backfill(self):
+        # Replay finest-timeframe history from the bar we were building when the feed
+        # dropped, so every stored timeframe and the MAs catch up on the missed bars.
+        finest = self.candle_store.get(self.underlying, self.candle_store.timeframes[0])
+        resume = finest.resume_ms()
+        if not resume:
+            return 0
+        now_ms = int(time.time() * 1000)
+        if now_ms - resume < finest.bucket_ms:
+            return 0
+        try:
+            bars = await self.broker.history(self.underlying, finest.minutes, resume, now_ms)
+        except Exception as e:
+            ERRORS.inc(stage="backfill", strategy=self.name)
+            self.notify("error", f"Backfill failed: {e}")
+            return 0
+        filled = self.replay_bars(bars, resume)
+        if filled:
+            BACKFILLED.inc(filled)
+            self.save_state()
+            self.notify("info", f"Backfilled {filled} candles since {datetime.fromtimestamp(resume / 1000, IST):%H:%M}")
+        return filled
+
+    # --- Orders ---
+
+    def place_order(self, token, symbol, side, tag, received=None, retry=False, order_type="MARKET", trigger_price=0.0,
+                    quantity=None):
+        # Queued on the order manager; the fill comes back through on_order_final
+        ORDERS.inc(side=side, strategy=self.name)
+        self.risk.record_order()
+        return self.orders.submit(tag, token, symbol, side, quantity or self.lot_size, order_type,
+                                  trigger_price=trigger_price, received=received, retry=retry)
+
+    def held(self, position):
+        # Units held: a lot, less whatever a partial fill left out
+        return position.get('quantity') or self.lot_size
+
+    def place_stop(self, position):
+        # SL-M sell at the trailing stop, working at the broker: it exits even if this
+        # process is gone. trail_stop() raises its trigger as the stop ratchets up.
+        attempt = position.get('stop_attempt', 0) + 1
+        position['stop_attempt'] = attempt
+        position['stop_trigger'] = stop_trigger(position['sl_price'])
+        position['stop_order'] = order_tag(self.name, position.get('entry_order', position['option_token']),
+                                           "STOP", attempt)
+        self.journal.append_position(position)
+        self.place_order(position['option_token'], position['tradingsymbol'], "SELL", position['stop_order'],
+                         retry=attempt > 1, order_type="SL-M", trigger_price=position['stop_trigger'],
+                         quantity=self.held(position))
+
+    def trail_stop(self, position):
+        trigger = stop_trigger(position['sl_price'])
+        if trigger > position['stop_trigger']:
+            position['stop_trigger'] = trigger
+            self.orders.modify(position['stop_order'], trigger_price=trigger)
+
+    def on_order_final(self, record):
+        position = self.state.get('position')
+        if not position:
+            return
+        prefix = "[PAPER] " if self.broker.paper else ""
+        if record['tag'] == position.get('entry_order') and position['entry_price'] is None:
+            if record['status'] == 'partial':
+                self.notify("warning", f"{prefix}Buy order {record['order_id'] or record['tag']} filled "
+                                       f"{record['filled']} of {record['quantity']}: {record['error'] or 'cancelled'}")
+            if record['status'] in ('complete', 'partial'):
+                self.entry_filled(position, record['average_price'], record['filled'] or record['quantity'])
+                return
+            self.notify("error", f"Buy order {record['order_id'] or record['tag']} was not filled: "
+                                 f"{record['error'] or record['status']}")
+            self.state['position'] = None
+            self.journal.append_position(None)
+            self.risk.released()
+            self.persist_risk()
+        elif record['tag'] == position.get('exit_order'):
+            if record['status'] == 'complete':
+                self.close_position(record['average_price'])
+                return
+            if record['status'] == 'partial':
+                self.partly_closed(position, record)
+            # Exit died; the next tick below the stop sends a new one
+            if record['attempts']:
+                self.notify("error", f"{prefix}Exit failed: {record['error'] or record['status']}")
+            del position['exit_order']
+            self.journal.append_position(position)
+        elif record['tag'] == position.get('stop_order'):
+            if record['status'] == 'complete':
+                self.close_position(record['average_price'])
+                return
+            if record['status'] == 'partial':
+                self.partly_closed(position, record)
+            position['stop_order'] = None
+            if self.risk.killed:
+                # Cancelled by the kill switch: now sell at market
+                self.journal.append_position(position)
+                self.exit_position(position)
+                return
+            # No stop at the broker any more: the ticks trail and exit as without one
+            self.notify("warning", f"{prefix}Stop order {record['order_id'] or record['tag']} "
+                                   f"{record['error'] or record['status']}; trailing on ticks")
+            self.journal.append_position(position)
+
+    def entry_filled(self, position, price, quantity=None):
+        prefix = "[PAPER] " if self.broker.paper else ""
+        fill_position(position, price, self.config)
+        position['quantity'] = quantity or self.lot_size
+        self.journal.append_position(position)
+        self.risk.filled(price * position['quantity'])
+        self.persist_risk()
+        self.notify("trade", f"{prefix}Bought {position['tradingsymbol']} @ {price}")
+        if self.stop_orders and not self.risk.killed:
+            self.place_stop(position)
+
+    async def resume_orders(self):
+        # Pick up an entry, exit or stop that was in flight when the process stopped
+        position = self.state.get('position')
+        if not position:
+            return
+        if position['entry_price'] is None and position.get('entry_order'):
+            await self.orders.resume(position['entry_order'], position['option_token'], position['tradingsymbol'],
+                                     "BUY", self.lot_size)
+        elif position.get('exit_order'):
+            await self.orders.resume(position['exit_order'], position['option_token'], position['tradingsymbol'],
+                                     "SELL", self.held(position))
+        elif self.stop_orders and position['entry_price'] is not None:
+            await self.reconcile_stop(position)
+
+    async def reconcile_stop(self, position):
+        # The broker's stop against the journaled position: a stop that filled while
+        # we were down closes the position, a working one is brought up to the
+        # journaled trail (modifications may have been pending), a missing one is placed.
+        if position.get('stop_order'):
+            record = await self.orders.resume(position['stop_order'], position['option_token'],
+                                              position['tradingsymbol'], "SELL", self.held(position), "SL-M",
+                                              trigger_price=position.get('stop_trigger', 0.0))
+            if record['status'] == 'open':
+                self.orders.modify(position['stop_order'], trigger_price=stop_trigger(position['sl_price']))
+        if self.state.get('position') is position and not position.get('stop_order'):
+            self.place_stop(position)
+
+    # --- Tick handlers ---
+
+    async def on_tick(self, tick, folded=(), received=None):
+        # Per tick only the candles; the signal runs once per closed bar in on_candle()
+        if tick.token != self.underlying:
+            return  # a late tick for an option we no longer hold must not reach the index candles
+        closed = self.update_underlying(tick.ts_ms, (*folded, tick.ltp))
+        if received is not None:
+            TICK_TO_CANDLE.since(received)
+        if closed is not None:
+            BAR_CLOSES.inc(source="tick", strategy=self.name)
+            await self.on_candle(closed, received)
+
+    async def on_bar_close(self, boundary_ms):
+        # The bar clock: closes the bars no tick has closed yet, so a quiet feed is not late
+        closed = self.candle_store.close_at(self.underlying, boundary_ms).get(self.config.candle_minutes)
+        if closed is not None:
+            self.indicators.close_candle(closed)
+            BAR_CLOSES.inc(source="clock", strategy=self.name)
+            await self.on_candle(closed)
+
+    async def on_candle(self, candle, received=None):
+        state = self.state
+        self.persist_candle(candle)
+        try:
+            await self.broker.prefetch(candle['close'], self.expiry_date)
+        except Exception as e:
+            ERRORS.inc(stage="instruments", strategy=self.name)
+            self.notify("error", f"Error prefetching instruments: {e}")
+
+        if self.chain is not None:
+            self.center_chain(candle['close'])
+
+        last = entry_signal(self.indicators, state)
+        if received is not None:
+            TICK_TO_SIGNAL.since(received)
+        if last is None:
+            return
+        SIGNALS.inc(strategy=self.name)
+        strike = self.select_strike(last)
+        opt_token, opt_symbol = await self.broker.option_contract(strike, self.expiry_date, 'CE')
+        if not opt_token:
+            self.notify("warning", "Option instrument not found.")
+            return
+
+        exposure = await self.entry_exposure(opt_token, opt_symbol)
+        reason = self.risk.check_entry(candle['timestamp'] + self.config.candle_minutes * 60000, exposure)
+        if reason is not None:
+            RISK_REJECTS.inc(reason=reason, strategy=self.name)
+            self.notify("warning", f"Entry on {strike} CE refused: {REASONS[reason]}")
+            return
+        self.risk.opened(exposure)
+
+        # One tag per signal candle: a repeated signal can never send a second entry
+        tag = order_tag(self.name, last['timestamp'], "BUY")
+        state['position'] = new_position(opt_token, opt_symbol, None, self.config)
+        state['position']['entry_order'] = tag
+        state['traded_candle'] = last['timestamp']
+        self.journal.append_position(state['position'])
+        self.journal.append_traded_candle(state['traded_candle'])
+        prefix = "[PAPER] " if self.broker.paper else ""
+        self.notify("trade", f"{prefix}Buying {strike} CE")
+        self.place_order(opt_token, opt_symbol, "BUY", tag, received)
+        # After the order: the journaled counters include it
+        self.persist_risk()
+
+    def select_strike(self, last):
+        # By delta or premium from the live chain when configured; the fixed offset
+        # otherwise, or while the chain has no usable quotes yet
+        if self.chain is not None:
+            bar = self.series().bar
+            strike = self.chain.select(bar['close'] if bar is not None else last['close'], self.config.target_delta,
+                                       self.config.premium_min, self.config.premium_max)
+            if strike is not None:
+                return strike
+            self.notify("warning", "No option chain quotes to pick a strike from; using the strike offset")
+        return entry_strike(last, self.config)
+
+    async def entry_exposure(self, token, symbol):
+        # Premium x quantity of the entry, priced only when there is an exposure limit:
+        # from the chain's live quotes, else one quote call. None when it cannot be priced.
+        if not self.risk.limits.max_exposure:
+            return 0.0
+        if self.chain is not None:
+            i = self.chain.index.get(str(token))
+            if i is not None and math.isfinite(self.chain.ltp[i]):
+                return float(self.chain.ltp[i]) * self.lot_size
+        try:
+            return await self.broker.quote(token, symbol) * self.lot_size
+        except Exception as e:
+            self.notify("warning", f"Error pricing the entry for the risk check: {e}")
+            return None
+
+    def partly_closed(self, position, record):
+        # A sell cancelled after part of it filled: those units are booked, the rest held
+        prefix = "[PAPER] " if self.broker.paper else ""
+        position['realized'] = (position.get('realized', 0.0)
+                                + (record['average_price'] - position['entry_price']) * record['filled'])
+        position['quantity'] = self.held(position) - record['filled']
+        self.notify("warning", f"{prefix}Sold {record['filled']} of {record['quantity']} @ {record['average_price']}; "
+                               f"{position['quantity']} still held")
+
+    def close_position(self, exit_price):
+        position = self.state['position']
+        pnl = position.get('realized', 0.0) + (exit_price - position['entry_price']) * self.held(position)
+        self.realized_pnl += pnl
+        self.trades += 1
+        prefix = "[PAPER] " if self.broker.paper else ""
+        self.notify("pnl", f"{prefix}Trade exited @ {exit_price}. P&L = {pnl}")
+        self.state['position'] = None
+        self.journal.append_position(None)
+        if self.risk.closed(pnl):
+            self.kill_switch_tripped()
+        self.persist_risk()
+
+    def kill_switch_tripped(self):
+        RISK_KILLS.inc(strategy=self.name)
+        self.notify("error", f"Daily loss limit of {self.risk.limits.max_daily_loss} hit "
+                             f"(P&L {self.risk.realized + self.risk.unrealized:.2f}); no more entries today")
+
+    async def on_option_tick(self, tick, received=None):
+        state = self.state
+        position = state.get('position')
+        if not position:
+            return
+        ltp_opt = tick.ltp
+        self.candle_store.update(tick.token, tick.ts_ms, ltp_opt)
+
+        # Orders the adapter cannot report on are taken as filled at the next option tick
+        if position['entry_price'] is None:
+            record = self.orders.get(position.get('entry_order'))
+            if record is not None and not record['tracked']:
+                self.entry_filled(position, ltp_opt)
+            return
+        if position.get('exit_order'):
+            record = self.orders.get(position['exit_order'])
+            if record is not None and not record['tracked']:
+                self.close_position(ltp_opt)
+            return
+
+        if self.risk.mark(tick.ts_ms, position.get('realized', 0.0)
+                          + (ltp_opt - position['entry_price']) * self.held(position)):
+            self.kill_switch_tripped()
+            self.persist_risk()
+        if self.risk.killed:
+            self.flatten(position, received)
+            return
+
+        moved, hit = trail_position(position, ltp_opt, self.config)
+        stop = position.get('stop_order')
+        if moved:
+            if stop:
+                self.trail_stop(position)
+            self.journal.append_trail(position)
+        if not hit or stop:
+            return  # a stop order at the broker exits on its own
+        self.exit_position(position, received)
+
+    def flatten(self, position, received=None):
+        # Kill switch: a working stop is cancelled first (on_order_final then exits),
+        # so the two can never both sell. Called again on every tick until it is out.
+        record = self.orders.get(position.get('stop_order'))
+        if record is not None and record['status'] not in FINAL:
+            self.orders.cancel(position['stop_order'])
+            return
+        self.exit_position(position, received)
+
+    def exit_position(self, position, received=None):
+        attempt = position.get('exit_attempt', 0) + 1
+        position['exit_attempt'] = attempt
+        entry = position.get('entry_order', position['option_token'])
+        position['exit_order'] = order_tag(self.name, entry, "SELL", attempt)
+        self.journal.append_position(position)
+        self.place_order(position['option_token'], position['tradingsymbol'], "SELL", position['exit_order'],
+                         received, retry=attempt > 1, quantity=self.held(position))
+
+    # --- Feed session ---
+
+    async def sync_option_subscription(self, feed, subscribed):
+        # Keep the feed subscribed to exactly the option we hold.
+        position = self.state.get('position')
+        wanted = str(position['option_token']) if position else None
+        if wanted == subscribed:
+            return subscribed
+        if subscribed:
+            if self.chain is None or subscribed not in self.chain.index:
+                await feed.unsubscribe([subscribed])
+            self.candle_store.drop(subscribed)
+        if wanted:
+            await feed.subscribe([wanted])
+        return wanted
+
+    def center_chain(self, spot):
+        # The calls within chain.width strikes of spot, from the instrument master
+        instruments = self.broker.instruments
+        strikes = instruments.strikes_around(spot, self.expiry_date, 'CE', self.chain.width)
+        self.chain.set_contracts([(strike, *instruments.lookup(strike, self.expiry_date, 'CE')) for strike in strikes])
+
+    async def sync_chain_subscription(self, feed, subscribed, option_token):
+        # Follow the chain as it re-centres; the held option stays subscribed either way
+        wanted = set(self.chain.tokens)
+        gone = sorted(t for t in subscribed - wanted if t != option_token)
+        if gone:
+            await feed.unsubscribe(gone)
+        if wanted - subscribed:
+            await feed.subscribe(sorted(wanted - subscribed))
+        return wanted
+
+    def open_queue(self):
+        self.tick_queue = TickQueue()
+        # Coalesce per finest timeframe so every stored timeframe keeps exact OHLC
+        self.bucket_ms = self.candle_store.timeframes[0] * 60 * 1000
+        return self.tick_queue
+
+    def enqueue(self, tick, received):
+        if tick.token == self.underlying:
+            self.tick_queue.put(tick, (tick.token, tick.ts_ms // self.bucket_ms), tick.ltp, received)
+        else:
+            self.tick_queue.put(tick, received=received)
+
+    def enqueue_bar_close(self, boundary_ms):
+        self.tick_queue.put(BarClose(boundary_ms))
+
+    async def process_ticks(self, feed, queue):
+        # Subscribe the option held from a previous run; the hub keeps it across reconnects
+        option_token = await self.sync_option_subscription(feed, None)
+        chain = self.chain
+        chain_tokens, chain_version = set(), None
+        if chain is not None and len(self.series()):
+            self.center_chain(self.series().records(1)[-1]['close'])
+        clock = asyncio.create_task(BarClock(self.candle_store.timeframes[0], self.enqueue_bar_close).run())
+        try:
+            while True:
+                entry = await queue.get()
+                tick = entry['tick']
+                started = time.perf_counter()
+                try:
+                    if type(tick) is BarClose:
+                        await self.on_bar_close(tick.ts_ms)
+                    else:
+                        for update in self.broker.observe(tick):
+                            self.orders.update(update)
+                        if chain is not None:
+                            chain.update(tick.token, tick.ts_ms, tick.ltp)
+                        if option_token and tick.token == option_token:
+                            TICKS.inc(kind="option", strategy=self.name)
+                            await self.on_option_tick(tick, entry['received'])
+                        elif tick.token == self.underlying:
+                            TICKS.inc(kind="underlying", strategy=self.name)
+                            # Replay the first/high/low of coalesced ticks so bar OHLC matches the full stream
+                            folded = (entry['open'], entry['high'], entry['low']) if entry['count'] > 1 else ()
+                            await self.on_tick(tick, folded, entry['received'])
+                        elif chain is not None and tick.token in chain.index:
+                            TICKS.inc(kind="chain", strategy=self.name)
+                        else:
+                            # Late ticks for an option we just unsubscribed
+                            TICKS.inc(kind="stale", strategy=self.name)
+                    option_token = await self.sync_option_subscription(feed, option_token)
+                    if chain is not None and chain.version != chain_version:
+                        chain_version = chain.version
+                        chain_tokens = await self.sync_chain_subscription(feed, chain_tokens, option_token)
+                except Exception as e:
+                    ERRORS.inc(stage="strategy", strategy=self.name)
+                    print(f"Error in tick processing: {e}")
+                ON_TICK.since(started)
+        finally:
+            clock.cancel()
+
+    async def start(self):
+        await self.broker.login()
+        try:
+            await self.broker.load_instruments()
+        except Exception as e:
+            self.notify("error", f"Error fetching instruments: {e}")
+        self.load_state()
+        await self.warm_up()
+        await self.resume_orders()
+
+    async def run(self):
+        # Standalone: this strategy alone on its own feed connection
+        hub = FeedHub(self.broker, self.capture, self.history)
+        try:
+            await self.start()
+            await hub.attach(self)
+            await hub.run()
+        finally:
+            self.broker.shutdown()
+            if self.history is not None:
+                self.history.close()
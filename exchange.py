@@ -0,0 +1,97 @@
+import itertools
+import os
+
+from backtest import FillModel
+
+
+class SimulatedExchange:
+    # Matches paper orders against the live or replayed tick stream. The clock is
+    # the feed's own timestamps, so a replay fills the same way at any speed.
+    # An order becomes marketable latency_ms after it was sent. Each following tick
+    # for its token fills at most `liquidity` units at the tick price plus slippage
+    # (FillModel), so large orders fill partially across several ticks.
+    # Stop orders wait for their trigger and then work as market (SL-M) or limit (SL) orders.
+    def __init__(self, fill=None, latency_ms=250, liquidity=None):
+        self.fill = fill or FillModel()
+        self.latency_ms = latency_ms
+        self.liquidity = liquidity
+        self.clock = None
+        self.prices = {}
+        self.orders = {}
+        self.working = {}
+        self.ids = itertools.count(1)
+        self.costs = 0.0
+
+    def submit(self, token, side, quantity, order_type="MARKET", price=0.0, trigger_price=0.0):
+        order_id = f"SIM-{next(self.ids)}"
+        order = {
+            'order_id': order_id, 'token': str(token), 'side': side, 'quantity': quantity,
+            'order_type': order_type, 'price': price, 'trigger_price': trigger_price,
+            'status': 'open', 'filled': 0, 'average_price': None, 'sent': self.clock,
+        }
+        self.orders[order_id] = order
+        self.working.setdefault(order['token'], []).append(order)
+        self.costs += self.fill.cost_per_order
+        return order
+
+    def modify(self, order_id, **changes):
+        order = self.orders[order_id]
+        if order['status'] == 'open':
+            order.update(changes)
+        return order
+
+    def cancel(self, order_id):
+        order = self.orders[order_id]
+        if order['status'] == 'open':
+            order['status'] = 'cancelled'
+            self.working[order['token']].remove(order)
+        return order
+
+    def _marketable(self, order, ltp):
+        kind = order['order_type']
+        if kind == "MARKET":
+            return True
+        if kind == "LIMIT":
+            return ltp <= order['price'] if order['side'] == "BUY" else ltp >= order['price']
+        # SL / SL-M: triggered once the tick trades through the trigger
+        if order['side'] == "BUY":
+            return ltp >= order['trigger_price']
+        return ltp <= order['trigger_price']
+
+    def on_tick(self, token, ts_ms, ltp):
+        if self.clock is None or ts_ms > self.clock:
+            self.clock = ts_ms
+        self.prices[token] = ltp
+        orders = self.working.get(token)
+        if not orders:
+            return ()
+        done = []
+        for order in orders:
+            if order['sent'] is None:
+                order['sent'] = ts_ms
+            if ts_ms < order['sent'] + self.latency_ms or not self._marketable(order, ltp):
+                continue
+            if order['order_type'] in ("SL", "SL-M"):
+                order['order_type'] = "MARKET" if order['order_type'] == "SL-M" else "LIMIT"
+                if not self._marketable(order, ltp):
+                    continue
+            price = self.fill.buy(ltp) if order['side'] == "BUY" else self.fill.sell(ltp)
+            if order['order_type'] == "LIMIT":
+                price = min(price, order['price']) if order['side'] == "BUY" else max(price, order['price'])
+            remaining = order['quantity'] - order['filled']
+            qty = remaining if self.liquidity is None else min(remaining, self.liquidity)
+            avg = order['average_price'] or 0.0
+            order['average_price'] = (avg * order['filled'] + price * qty) / (order['filled'] + qty)
+            order['filled'] += qty
+            if order['filled'] >= order['quantity']:
+                order['status'] = 'complete'
+                done.append(order)
+        for order in done:
+            orders.remove(order)
+        return done
+
+    @classmethod
+    def from_env(cls):
+        liquidity = os.environ.get("PAPER_LIQUIDITY")
+        fill = FillModel(float(os.environ.get("PAPER_SLIPPAGE", 0.0)), float(os.environ.get("PAPER_COST_PER_ORDER", 0.0)))
+        return cls(fill, int(os.environ.get("PAPER_LATENCY_MS", 250)), int(liquidity) if liquidity else None)
@@ -0,0 +1,61 @@
+import asyncio
+from collections import deque
+
+
+class TickQueue:
+    # Bounded FIFO between the feed receiver and the strategy task. Ticks that
+    # share a coalesce key (token, candle bucket) collapse into one entry that keeps
+    # the first/high/low prices and the latest tick, so candle OHLC is unchanged.
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self.items = deque()
+        self.pending = {}
+        self.ready = asyncio.Event()
+        self.enqueued = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.max_depth = 0
+
+    def __len__(self):
+        return len(self.items)
+
+    def put(self, tick, key=None, price=None, received=None):
+        if key is not None:
+            entry = self.pending.get(key)
+            if entry is not None:
+                entry['tick'] = tick
+                entry['high'] = max(entry['high'], price)
+                entry['low'] = min(entry['low'], price)
+                entry['count'] += 1
+                self.coalesced += 1
+                return True
+        if len(self.items) >= self.maxsize:
+            self.dropped += 1
+            return False
+        entry = {'tick': tick, 'key': key, 'open': price, 'high': price, 'low': price, 'count': 1,
+                 'received': received}
+        if key is not None:
+            self.pending[key] = entry
+        self.items.append(entry)
+        self.enqueued += 1
+        self.max_depth = max(self.max_depth, len(self.items))
+        self.ready.set()
+        return True
+
+    async def get(self):
+        while not self.items:
+            self.ready.clear()
+            await self.ready.wait()
+        entry = self.items.popleft()
+        if entry['key'] is not None:
+            del self.pending[entry['key']]
+        return entry
+
+    def stats(self):
+        return {
+            'depth': len(self.items),
+            'max_depth': self.max_depth,
+            'enqueued': self.enqueued,
+            'coalesced': self.coalesced,
+            'dropped': self.dropped,
+        }
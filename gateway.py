@@ -0,0 +1,38 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class BrokerGateway:
+    # Runs blocking broker SDK calls (SmartConnect or Upstox) on a bounded thread
+    # pool so the event loop keeps reading the feed. Every call is awaitable and
+    # bounded by a timeout; the client's HTTP layer is swapped for a pooled
+    # keep-alive session where the SDK exposes one.
+    def __init__(self, client, max_workers=4, timeout=10.0, pool_size=8):
+        self.client = client
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="broker")
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        for attr in ("reqsession", "session"):
+            if hasattr(client, attr):
+                setattr(client, attr, self.session)
+
+    async def run(self, fn, *args, timeout=None, **kwargs):
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
+        return await asyncio.wait_for(future, timeout or self.timeout)
+
+    async def call(self, method, *args, timeout=None, **kwargs):
+        return await self.run(getattr(self.client, method), *args, timeout=timeout, **kwargs)
+
+    async def place_order(self, order_params):
+        return await self.call("placeOrder", order_params)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
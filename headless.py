@@ -0,0 +1,171 @@
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import time
+from collections import deque
+
+from snapshot import SnapshotWriter, unlink_stale, writer_pid
+
+# The engine as its own process. It publishes candles, position and P&L to a
+# shared-memory snapshot (snapshot.py) that the Streamlit pages poll, so a UI
+# rerun never touches the trading loop. Credentials come from the environment:
+# API_KEY/USER_ID/PASSWORD/TOTP_SECRET (or a current TOTP) for angelone,
+# API_KEY/ACCESS_TOKEN for upstox.
+
+
+def build_engine(args, notify):
+    from brokers import PaperBroker, SmartConnectBroker, UpstoxBroker
+    from engine import Engine
+    from exchange import SimulatedExchange
+    from gateway import BrokerGateway
+    from instruments import InstrumentMaster, smartapi_rows
+    from strategy import StrategyConfig
+
+    if args.broker == "angelone":
+        from smartapi import SmartConnect
+        api_key = os.environ.get("API_KEY")
+        broker = SmartConnectBroker(BrokerGateway(SmartConnect(api_key=api_key)), api_key,
+                                    os.environ.get("USER_ID"), os.environ.get("PASSWORD"),
+                                    underlying=args.underlying,
+                                    instruments=InstrumentMaster("instruments_nfo_angelone", smartapi_rows),
+                                    totp_secret=os.environ.get("TOTP_SECRET"), totp=os.environ.get("TOTP"))
+    else:
+        from upstox import Upstox
+        broker = UpstoxBroker(BrokerGateway(Upstox(os.environ.get("API_KEY"), os.environ.get("ACCESS_TOKEN"))),
+                              args.underlying)
+    if args.paper:
+        broker = PaperBroker(broker, exchange=SimulatedExchange.from_env())
+    history = None
+    if args.history:
+        from history import HistoryStore
+        history = HistoryStore(args.history)
+    state_file = args.state_file or f"bot_state_{args.broker}.json"
+    return Engine(broker, args.expiry, args.lot_size, StrategyConfig.from_env(), state_file, notify=notify,
+                  name=args.name, history=history)
+
+
+class Publisher:
+    # Collects the engine's notifications and rewrites the snapshot every
+    # `interval` seconds from its own task, off the tick path.
+    def __init__(self, writer, interval=0.5, keep=50, candles=60):
+        self.writer = writer
+        self.interval = interval
+        self.events = deque(maxlen=keep)
+        self.candles = candles
+        self.engine = None
+        self.started = time.time()
+
+    def notify(self, kind, message):
+        self.events.append({'time': time.time(), 'kind': kind, 'message': message})
+        print(message)
+
+    def snapshot(self, status="running"):
+        engine = self.engine
+        position = engine.state.get('position')
+        open_pnl = None
+        if position and position.get('entry_price') is not None:
+            series = engine.candle_store.series.get(str(position['option_token']))
+            bar = series[engine.candle_store.timeframes[0]].bar if series else None
+            if bar is not None:
+                open_pnl = (bar['close'] - position['entry_price']) * engine.lot_size
+        return {
+            'name': engine.name,
+            'broker': engine.broker.name,
+            'paper': engine.broker.paper,
+            'pid': os.getpid(),
+            'status': status,
+            'started': self.started,
+            'updated': time.time(),
+            'expiry_date': engine.expiry_date,
+            'lot_size': engine.lot_size,
+            'candle_minutes': engine.config.candle_minutes,
+            'candles': engine.series().records(self.candles),
+            'indicators': engine.indicators.last,
+            'position': position,
+            'realized_pnl': engine.realized_pnl,
+            'open_pnl': open_pnl,
+            'trades': engine.trades,
+            'risk': engine.risk.status(),
+            'queue': engine.tick_queue.stats() if engine.tick_queue is not None else None,
+            'events': list(self.events),
+        }
+
+    def publish(self, status="running"):
+        try:
+            self.writer.write(self.snapshot(status))
+        except Exception as e:
+            print(f"Error publishing snapshot: {e}")
+
+    async def run(self):
+        while True:
+            self.publish()
+            await asyncio.sleep(self.interval)
+
+
+async def run(args):
+    writer = SnapshotWriter(args.name)
+    publisher = Publisher(writer, args.interval)
+    publisher.engine = build_engine(args, publisher.notify)
+    publisher.publish("starting")
+    task = asyncio.current_task()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, task.cancel)
+        except NotImplementedError:
+            pass  # Windows: SIGTERM ends the process without cleanup
+    publishing = asyncio.create_task(publisher.run())
+    try:
+        await publisher.engine.run()
+    except asyncio.CancelledError:
+        pass
+    finally:
+        publishing.cancel()
+        await asyncio.gather(publishing, return_exceptions=True)
+        publisher.engine.save_state()
+        writer.close()
+
+
+def spawn(broker, name, expiry, lot_size, paper, env=None, underlying=256265):
+    # Detached from the calling Streamlit script: its reruns and restarts leave the engine running
+    args = [sys.executable, os.path.abspath(__file__), broker, "--name", name, "--expiry", expiry,
+            "--lot-size", str(lot_size), "--underlying", str(underlying)]
+    if paper:
+        args.append("--paper")
+    return subprocess.Popen(args, env={**os.environ, **(env or {})}, start_new_session=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+
+
+def stop(name):
+    pid = writer_pid(name)
+    if pid is None:
+        return False
+    try:
+        os.kill(pid, signal.SIGTERM)
+    except ProcessLookupError:
+        unlink_stale(name)  # killed without cleaning up; let the next start create it afresh
+        return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the MA bot without a UI, publishing its state to shared memory.")
+    parser.add_argument("broker", choices=("angelone", "upstox"))
+    parser.add_argument("--name", help="snapshot name the UI reads (default: the broker)")
+    parser.add_argument("--expiry", default=os.environ.get("EXPIRY_DATE"), help="option expiry, YYYY-MM-DD")
+    parser.add_argument("--lot-size", type=int, default=int(os.environ.get("LOT_SIZE", 50)))
+    parser.add_argument("--underlying", default=256265)
+    parser.add_argument("--paper", action="store_true", help="fill orders on the simulated exchange")
+    parser.add_argument("--state-file")
+    parser.add_argument("--history", default=os.environ.get("HISTORY_DIR"), help="directory for the Arrow tick history")
+    parser.add_argument("--interval", type=float, default=0.5, help="seconds between snapshots")
+    args = parser.parse_args()
+    args.name = args.name or args.broker
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
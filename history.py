@@ -0,0 +1,163 @@
+import glob
+import os
+import queue
+import threading
+from datetime import datetime
+
+import numpy as np
+
+from candles import IST
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:
+    pa = None
+
+DAY_MS = 24 * 60 * 60 * 1000
+IST_OFFSET_MS = 330 * 60 * 1000
+
+
+def trading_day(ts_ms):
+    return datetime.fromtimestamp(ts_ms / 1000, IST).date().isoformat()
+
+
+class HistoryStore:
+    # Daily tick history as Arrow IPC files:
+    #   root/ticks/date=YYYY-MM-DD/token=<token>/part-NNNNNN.arrow
+    # The feed only appends to in-memory column lists. Every batch_size ticks or
+    # flush_interval seconds of feed time the lists go to a writer thread, which
+    # writes one immutable part per token, and merges a day's parts into one file
+    # once the day is over (or the store is closed). Reads memory-map the parts, so
+    # backtests and warm-up get zero-copy Arrow columns; 1-minute candles are built
+    # from them on read.
+    def __init__(self, root="history", batch_size=5000, flush_interval=60.0):
+        if pa is None:
+            raise ImportError("HistoryStore needs pyarrow (pip install pyarrow)")
+        self.root = root
+        self.batch_size = batch_size
+        self.flush_ms = int(flush_interval * 1000)
+        self.ticks = {}
+        self.pending = 0
+        self.flush_due = 0
+        self.day = None
+        self.day_start = self.day_end = 0
+        self.queue = queue.Queue()
+        self.writer = None
+        self.parts = {}
+
+    # --- Writing (feed side) ---
+
+    def record(self, token, ts_ms, ltp):
+        if not self.day_start <= ts_ms < self.day_end:
+            self.flush()
+            self.day = trading_day(ts_ms)
+            self.day_start = ts_ms - (ts_ms + IST_OFFSET_MS) % DAY_MS
+            self.day_end = self.day_start + DAY_MS
+        cols = self.ticks.get(token)
+        if cols is None:
+            cols = self.ticks[token] = ([], [])
+        cols[0].append(ts_ms)
+        cols[1].append(ltp)
+        self.pending += 1
+        if self.pending >= self.batch_size or ts_ms >= self.flush_due:
+            self.flush(ts_ms)
+
+    def flush(self, ts_ms=0):
+        if self.ticks:
+            if self.writer is None:
+                self.writer = threading.Thread(target=self._write_loop, name="history", daemon=True)
+                self.writer.start()
+            self.queue.put((self.day, self.ticks))
+            self.ticks = {}
+        self.pending = 0
+        self.flush_due = ts_ms + self.flush_ms
+
+    def close(self):
+        self.flush()
+        if self.writer is not None:
+            self.queue.put(None)
+            self.writer.join()
+            self.writer = None
+
+    def _write_loop(self):
+        written = None
+        while True:
+            item = self.queue.get()
+            day = item and item[0]
+            try:
+                if written is not None and day != written:
+                    self.compact(written)
+                if item is None:
+                    return
+                for token, (ts, ltp) in item[1].items():
+                    self._write_part(day, token, pa.table({
+                        "ts_ms": pa.array(ts, pa.int64()), "ltp": pa.array(ltp, pa.float64())}))
+                written = day
+            except Exception as e:
+                print(f"Error writing history: {e}")
+
+    def _write_part(self, day, token, table):
+        directory = os.path.join(self.root, "ticks", f"date={day}", f"token={token}")
+        n = self.parts.get(directory)
+        if n is None:
+            os.makedirs(directory, exist_ok=True)
+            n = len(glob.glob(os.path.join(directory, "part-*.arrow")))
+        self.parts[directory] = n + 1
+        path = os.path.join(directory, f"part-{n:06d}.arrow")
+        tmp = path + ".tmp"
+        with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp, path)
+
+    def compact(self, day):
+        # One part per token for the day instead of one per flush
+        for directory in glob.glob(os.path.join(self.root, "ticks", f"date={day}", "token=*")):
+            paths = sorted(glob.glob(os.path.join(directory, "part-*.arrow")))
+            if len(paths) < 2:
+                continue
+            tables = [pa.ipc.open_file(pa.memory_map(path)).read_all() for path in paths]
+            merged = pa.concat_tables(tables).combine_chunks()
+            del tables  # release the maps before removing the files
+            self._write_part(day, directory.rsplit("token=", 1)[1], merged)
+            for path in paths:
+                os.remove(path)
+
+    # --- Reading ---
+
+    def days(self):
+        return sorted(p.split("date=", 1)[1] for p in glob.glob(os.path.join(self.root, "ticks", "date=*")))
+
+    def read_ticks(self, token, start_day=None, end_day=None):
+        # One memory-mapped record batch chunk per part file
+        tables = []
+        for day in self.days():
+            if (start_day and day < start_day) or (end_day and day > end_day):
+                continue
+            pattern = os.path.join(self.root, "ticks", f"date={day}", f"token={token}", "part-*.arrow")
+            tables.extend(pa.ipc.open_file(pa.memory_map(path)).read_all() for path in sorted(glob.glob(pattern)))
+        if not tables:
+            return pa.table({"ts_ms": pa.array([], pa.int64()), "ltp": pa.array([], pa.float64())})
+        return pa.concat_tables(tables)
+
+    def candles(self, token, since_ms=None, until_ms=None, minutes=1):
+        # OHLC bars on the CandleStore buckets, oldest first; the last one may still be forming
+        table = self.read_ticks(str(token), since_ms and trading_day(since_ms), until_ms and trading_day(until_ms))
+        ts = table.column("ts_ms").to_numpy()
+        ltp = table.column("ltp").to_numpy()
+        keep = np.ones(len(ts), dtype=bool)
+        if since_ms is not None:
+            keep &= ts >= since_ms - since_ms % (minutes * 60000)
+        if until_ms is not None:
+            keep &= ts <= until_ms
+        ts, ltp = ts[keep], ltp[keep]
+        if not len(ts):
+            return []
+        order = np.argsort(ts, kind="stable")
+        ts, ltp = ts[order], ltp[order]
+        buckets = ts - ts % (minutes * 60000)
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        ends = np.r_[starts[1:], len(ts)] - 1
+        rows = zip(buckets[starts].tolist(), ltp[starts].tolist(), np.maximum.reduceat(ltp, starts).tolist(),
+                   np.minimum.reduceat(ltp, starts).tolist(), ltp[ends].tolist())
+        return [{'timestamp': t, 'open': o, 'high': h, 'low': l, 'close': c} for t, o, h, l, c in rows]
@@ -0,0 +1,128 @@
+import asyncio
+import time
+
+from metrics import REGISTRY
+from replay import FeedRecorder
+from session import supervise
+
+ERRORS = REGISTRY.counter("bot_errors_total", "Errors on the tick path")
+RECONNECTS = REGISTRY.counter("bot_feed_reconnects_total", "Feed sessions restarted by the supervisor")
+FANOUT = REGISTRY.histogram("bot_feed_fanout_seconds", "Decode and fan-out of one feed frame")
+
+
+class HubFeed:
+    # An engine's view of the shared feed: its (un)subscribes are reference counted.
+    def __init__(self, hub, engine):
+        self.hub = hub
+        self.engine = engine
+
+    async def subscribe(self, tokens):
+        await self.hub.subscribe(self.engine, tokens)
+
+    async def unsubscribe(self, tokens):
+        await self.hub.unsubscribe(self.engine, tokens)
+
+
+class FeedHub:
+    # One feed connection shared by any number of engines on this loop. Each frame
+    # is decoded once and every tick is queued to the engines subscribed to its
+    # token. A token stays subscribed while any engine wants it, and the whole set
+    # is resubscribed after a reconnect. Engines keep their own queue and task, so
+    # a slow strategy cannot hold up the others. Every tick also goes to the
+    # history store, when there is one.
+    def __init__(self, broker, capture=None, history=None):
+        self.broker = broker
+        self.capture = capture
+        self.history = history
+        self.routes = {}
+        self.tasks = {}
+        self.feed = None
+
+    @property
+    def engines(self):
+        return list(self.tasks)
+
+    async def subscribe(self, engine, tokens):
+        new = []
+        for token in map(str, tokens):
+            engines = self.routes.setdefault(token, [])
+            if engine in engines:
+                continue
+            if not engines:
+                new.append(token)
+            engines.append(engine)
+        if new and self.feed is not None:
+            await self.feed.subscribe(new)
+
+    async def unsubscribe(self, engine, tokens):
+        gone = []
+        for token in map(str, tokens):
+            engines = self.routes.get(token)
+            if not engines or engine not in engines:
+                continue
+            engines.remove(engine)
+            if not engines:
+                del self.routes[token]
+                gone.append(token)
+        if gone and self.feed is not None:
+            await self.feed.unsubscribe(gone)
+
+    async def attach(self, engine):
+        engine.open_queue()
+        await self.subscribe(engine, [engine.underlying])
+        self.tasks[engine] = asyncio.create_task(engine.process_ticks(HubFeed(self, engine), engine.tick_queue))
+        if self.feed is not None:
+            await engine.backfill()
+
+    async def detach(self, engine):
+        task = self.tasks.pop(engine, None)
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        await self.unsubscribe(engine, [t for t, engines in list(self.routes.items()) if engine in engines])
+
+    async def receive(self, feed, recorder=None):
+        decoder = self.broker.decoder()
+        routes = self.routes
+        history = self.history
+        while True:
+            msg = await feed.recv()
+            received = time.perf_counter()
+            if recorder is not None:
+                recorder.record(msg)
+            errors = decoder.errors
+            try:
+                for tick in decoder.decode(msg):
+                    if history is not None:
+                        history.record(tick.token, tick.ts_ms, tick.ltp)
+                    for engine in routes.get(tick.token, ()):
+                        engine.enqueue(tick, received)
+            except Exception as e:
+                ERRORS.inc(stage="receive")
+                print(f"Error in websocket message processing: {e}")
+            if decoder.errors != errors:
+                ERRORS.inc(decoder.errors - errors, stage="decode")
+            FANOUT.since(received)
+
+    async def run_session(self):
+        async with self.broker.open_feed() as feed:
+            # Set first, so engines attached while this subscribe is in flight send their own
+            self.feed = feed
+            recorder = FeedRecorder(self.capture) if self.capture else None
+            try:
+                if self.routes:
+                    await feed.subscribe(list(self.routes))
+                for engine in self.engines:
+                    await engine.backfill()
+                await self.receive(feed, recorder)
+            finally:
+                self.feed = None
+                if recorder is not None:
+                    recorder.close()
+
+    async def run(self):
+        try:
+            await supervise(self.run_session, on_retry=lambda reason: RECONNECTS.inc())
+        finally:
+            for engine in self.engines:
+                await self.detach(engine)
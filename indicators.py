@@ -0,0 +1,68 @@
+from collections import deque
+
+
+class RollingMean:
+    # Fixed-window mean kept as a compensated running sum, so each push is O(1).
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.total = 0.0
+        self.comp = 0.0
+
+    def _add(self, x):
+        y = x - self.comp
+        t = self.total + y
+        self.comp = (t - self.total) - y
+        self.total = t
+
+    def push(self, value):
+        self.values.append(value)
+        self._add(value)
+        if len(self.values) > self.window:
+            self._add(-self.values.popleft())
+
+    @property
+    def value(self):
+        if len(self.values) < self.window:
+            return None
+        return self.total / self.window
+
+
+class MovingAverages:
+    # Streaming fast/slow MAs over closed candles. `last` mirrors df.iloc[-2]
+    # of the rolling(fast)/rolling(slow) frame: the last closed candle plus its MAs.
+    def __init__(self, fast=10, slow=21):
+        self.fast = RollingMean(fast)
+        self.slow = RollingMean(slow)
+        self.forming = None
+        self.forming_close = None
+        self.last = None
+
+    @property
+    def ready(self):
+        return self.last is not None and self.last['ma_slow'] is not None
+
+    def seed(self, candles):
+        self.__init__(self.fast.window, self.slow.window)
+        for c in candles[:-1]:
+            self.close_candle(c)
+        if candles:
+            self.forming = candles[-1]['timestamp']
+            self.forming_close = candles[-1]['close']
+
+    def close_candle(self, candle):
+        self.fast.push(candle['close'])
+        self.slow.push(candle['close'])
+        self.last = {**candle, 'ma_fast': self.fast.value, 'ma_slow': self.slow.value}
+
+    def update(self, candles):
+        # Call after update_candles; returns True when the previous candle just closed.
+        c = candles[-1]
+        closed = False
+        if c['timestamp'] != self.forming:
+            if self.forming is not None and len(candles) > 1:
+                self.close_candle(candles[-2])
+                closed = True
+            self.forming = c['timestamp']
+        self.forming_close = c['close']
+        return closed
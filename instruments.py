@@ -0,0 +1,101 @@
+import bisect
+import glob
+import gzip
+import json
+import os
+from datetime import date, datetime
+
+SCRIP_MASTER_URL = os.environ.get("SCRIP_MASTER_URL",
+                                  "https://margincalculator.angelbroking.com/OpenAPI_File/files/OpenAPIScripMaster.json")
+SCRIP_MASTER_TIMEOUT = float(os.environ.get("SCRIP_MASTER_TIMEOUT", 60))
+
+
+def scrip_master_rows(scrips, name="NIFTY"):
+    # Index options of `name` from Angel's OpenAPI scrip master. Its strikes are in
+    # paise and its expiries read like 04JAN2024; the option type ends the symbol.
+    rows = []
+    for inst in scrips:
+        if inst.get('exch_seg') != "NFO" or inst.get('instrumenttype') != "OPTIDX" or inst.get('name') != name:
+            continue
+        option_type = inst['symbol'][-2:]
+        if option_type not in ('CE', 'PE'):
+            continue
+        rows.append([datetime.strptime(inst['expiry'], "%d%b%Y").strftime("%Y-%m-%d"), float(inst['strike']) / 100,
+                     option_type, inst['token'], inst['symbol']])
+    return rows
+
+
+def smartapi_rows(gateway):
+    # SmartConnect has no instrument list call; the scrip master is a plain download
+    # on the gateway's pooled session
+    response = gateway.session.get(SCRIP_MASTER_URL, timeout=SCRIP_MASTER_TIMEOUT)
+    response.raise_for_status()
+    return scrip_master_rows(response.json())
+
+
+def upstox_rows(gateway):
+    rows = []
+    for inst in gateway.client.get_instruments('NFO'):
+        if not inst.get('expiry') or not inst.get('strike_price') or not inst.get('option_type'):
+            continue
+        rows.append([inst['expiry'].strftime("%Y-%m-%d"), float(inst['strike_price']),
+                     inst['option_type'].upper(), inst['instrument_token'], inst.get('symbol')])
+    return rows
+
+
+class InstrumentMaster:
+    # Option contracts indexed by (expiry, strike, option_type). The broker list is
+    # fetched at most once per trading day and cached on disk as gzipped JSON rows
+    # of [expiry, strike, option_type, token, tradingsymbol]. fetch_rows(gateway)
+    # downloads it, on one of the gateway's threads.
+    def __init__(self, cache_prefix, fetch_rows):
+        self.cache_prefix = cache_prefix
+        self.fetch_rows = fetch_rows
+        self.day = None
+        self.index = {}
+        self.strikes = {}
+
+    def cache_path(self, day):
+        return f"{self.cache_prefix}_{day}.json.gz"
+
+    def ensure_loaded(self, gateway, day=None):
+        day = day or date.today().isoformat()
+        if self.day == day:
+            return
+        path = self.cache_path(day)
+        if os.path.exists(path):
+            with gzip.open(path, "rt") as f:
+                rows = json.load(f)
+        else:
+            rows = self.fetch_rows(gateway)
+            tmp = path + ".tmp"
+            with gzip.open(tmp, "wt") as f:
+                json.dump(rows, f, separators=(",", ":"))
+            os.replace(tmp, path)
+            for old in glob.glob(self.cache_path("*")):
+                if old != path:
+                    os.remove(old)
+        self.build(rows)
+        self.day = day
+
+    def build(self, rows):
+        self.index = {}
+        strikes = {}
+        for expiry, strike, option_type, token, symbol in rows:
+            self.index[(expiry, strike, option_type)] = (token, symbol)
+            strikes.setdefault((expiry, option_type), set()).add(strike)
+        self.strikes = {k: sorted(v) for k, v in strikes.items()}
+
+    def lookup(self, strike, expiry_date, option_type='CE'):
+        return self.index.get((expiry_date, float(strike), option_type), (None, None))
+
+    def strikes_around(self, spot, expiry_date, option_type='CE', width=10):
+        strikes = self.strikes.get((expiry_date, option_type), [])
+        i = bisect.bisect_left(strikes, spot)
+        return strikes[max(i - width, 0):i + width]
+
+    def prefetch(self, gateway, spot, expiry_date, option_type='CE', width=10):
+        # Load the day's list ahead of a signal so entry never fetches; lookup()
+        # is then a dict hit for any strike.
+        self.ensure_loaded(gateway)
+        return self.strikes_around(spot, expiry_date, option_type, width)
@@ -0,0 +1,128 @@
+import json
+import os
+import threading
+
+
+class StateJournal:
+    # Snapshot (the old STATE_FILE) plus an append-only journal of small records.
+    # Candle and trail records are only flushed; position open/close, the traded
+    # candle and the risk counters are fsynced. Replay is idempotent, so a crash
+    # between writing a snapshot and dropping the rotated journal is harmless.
+    def __init__(self, path, compact_every=500):
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.rotated_path = path + ".journal.old"
+        self.compact_every = compact_every
+        self.lock = threading.Lock()
+        self.file = None
+        self.pending = 0
+        self.compactor = None
+
+    def _write(self, kind, value, sync=False):
+        line = json.dumps({"k": kind, "v": value}, default=str, separators=(",", ":"))
+        with self.lock:
+            if self.file is None:
+                self.file = open(self.journal_path, "a", buffering=1)
+            self.file.write(line + "\n")
+            if sync:
+                os.fsync(self.file.fileno())
+            self.pending += 1
+
+    def append_candle(self, candle):
+        self._write("c", candle)
+
+    def append_trail(self, position):
+        self._write("p", position)
+
+    def append_position(self, position):
+        self._write("p", position, sync=True)
+
+    def append_traded_candle(self, ts):
+        self._write("t", ts, sync=True)
+
+    def append_risk(self, counters):
+        self._write("r", counters, sync=True)
+
+    @staticmethod
+    def _apply(state, record):
+        kind, value = record["k"], record["v"]
+        if kind == "c":
+            candles = state["candles"]
+            if candles and candles[-1]["timestamp"] == value["timestamp"]:
+                candles[-1] = value
+            else:
+                candles.append(value)
+        elif kind == "p":
+            state["position"] = value
+        elif kind == "t":
+            state["traded_candle"] = value
+        elif kind == "r":
+            state["risk"] = value
+
+    def _replay(self, path, state):
+        replayed = 0
+        if not os.path.exists(path):
+            return replayed
+        with open(path, "r") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break  # torn final write
+                self._apply(state, record)
+                replayed += 1
+        return replayed
+
+    def load(self):
+        state = {"candles": [], "position": None, "traded_candle": None, "risk": None}
+        if os.path.exists(self.path):
+            with open(self.path, "r") as f:
+                state.update(json.load(f))
+        replayed = self._replay(self.rotated_path, state)
+        replayed += self._replay(self.journal_path, state)
+        if replayed:
+            self._write_snapshot(state)
+            for p in (self.rotated_path, self.journal_path):
+                if os.path.exists(p):
+                    os.remove(p)
+        return state
+
+    def _write_snapshot(self, state):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(state, f, default=str)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def _finish_compaction(self, snapshot):
+        self._write_snapshot(snapshot)
+        if os.path.exists(self.rotated_path):
+            os.remove(self.rotated_path)
+
+    def compact(self, state, background=True):
+        if self.compactor is not None and self.compactor.is_alive():
+            if background:
+                return
+            self.compactor.join()
+        with self.lock:
+            snapshot = {
+                "candles": [dict(c) for c in state.get("candles", [])],
+                "position": dict(state["position"]) if state.get("position") else None,
+                "traded_candle": state.get("traded_candle"),
+                "risk": dict(state["risk"]) if state.get("risk") else None,
+            }
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+            if os.path.exists(self.journal_path):
+                os.replace(self.journal_path, self.rotated_path)
+            self.pending = 0
+        if background:
+            self.compactor = threading.Thread(target=self._finish_compaction, args=(snapshot,), daemon=True)
+            self.compactor.start()
+        else:
+            self._finish_compaction(snapshot)
+
+    def due(self):
+        return self.pending >= self.compact_every
@@ -0,0 +1,107 @@
+import bisect
+import time
+
+# Minimal in-process metrics rendered in the Prometheus text format. Updates are
+# plain attribute/list writes from the bot thread; render() only reads them, so
+# scraping never takes a lock the hot path could wait on.
+
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self.values = {}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in list(self.values.items()):
+            lines.append(f"{self.name}{_labels(key)} {value}")
+        return lines
+
+
+class Gauge:
+    # Value is read from a callback at scrape time.
+    def __init__(self, name, help_text, read):
+        self.name = name
+        self.help = help_text
+        self.read = read
+
+    def render(self):
+        try:
+            value = self.read()
+        except Exception:
+            return []
+        if value is None:
+            return []
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {value}"]
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def since(self, started):
+        # Observe the time elapsed since a perf_counter() reading.
+        self.observe(time.perf_counter() - started)
+
+    def render(self):
+        counts = list(self.counts)
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        cumulative = 0
+        for bound, n in zip(self.buckets, counts):
+            cumulative += n
+            lines.append(f'{self.name}_bucket{{le="{bound}"}} {cumulative}')
+        cumulative += counts[-1]
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {cumulative}')
+        lines.append(f"{self.name}_sum {self.sum}")
+        lines.append(f"{self.name}_count {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+
+    def _add(self, metric):
+        return self.metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help_text):
+        return self._add(Counter(name, help_text))
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, help_text, buckets))
+
+    def gauge(self, name, help_text, read):
+        return self._add(Gauge(name, help_text, read))
+
+    def render(self):
+        lines = []
+        for metric in list(self.metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
@@ -0,0 +1,105 @@
+import argparse
+import itertools
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from backtest import FillModel, load_prices, run_backtest
+from strategy import StrategyConfig
+
+# Grid / random search over the strategy parameters. The price arrays are placed
+# in shared memory once; each worker maps them read-only instead of copying.
+
+_worker = {}
+
+
+def _share(array):
+    shm = shared_memory.SharedMemory(create=True, size=array.nbytes)
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[:] = array
+    return shm, (shm.name, array.shape, array.dtype.str)
+
+
+def _attach(ts_spec, price_spec, backtest_kwargs):
+    for key, (name, shape, dtype) in (("ts", ts_spec), ("prices", price_spec)):
+        shm = shared_memory.SharedMemory(name=name)
+        array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+        array.flags.writeable = False
+        _worker[key] = array
+        _worker[key + "_shm"] = shm
+    _worker["kwargs"] = backtest_kwargs
+
+
+def _evaluate(config):
+    result = run_backtest(_worker["ts"], _worker["prices"], config, **_worker["kwargs"])
+    return {**vars(config), **result}
+
+
+def parameter_grid(fast, slow, strike_offset, trail_pct, candle_minutes):
+    for combo in itertools.product(fast, slow, strike_offset, trail_pct, candle_minutes):
+        config = StrategyConfig(*combo)
+        if config.fast < config.slow:
+            yield config
+
+
+def sweep(ts, prices, configs, workers=None, rank_by="pnl", **backtest_kwargs):
+    ts_shm, ts_spec = _share(np.ascontiguousarray(ts, dtype=np.int64))
+    price_shm, price_spec = _share(np.ascontiguousarray(prices, dtype=np.float64))
+    try:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_attach,
+                                 initargs=(ts_spec, price_spec, backtest_kwargs)) as pool:
+            rows = list(pool.map(_evaluate, configs, chunksize=4))
+    finally:
+        for shm in (ts_shm, price_shm):
+            shm.close()
+            shm.unlink()
+    results = pd.DataFrame(rows).drop(columns=["ticks", "seconds", "ticks_per_min"])
+    return results.sort_values(rank_by, ascending=False, ignore_index=True)
+
+
+def _ints(text):
+    return [int(v) for v in text.split(",")]
+
+
+def _floats(text):
+    return [float(v) for v in text.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel parameter sweep for the MA crossover bot")
+    parser.add_argument("prices", help="CSV/Parquet of underlying ticks (timestamp, price) or OHLC bars, "
+                                       "or a history.py directory")
+    parser.add_argument("--token", default="256265", help="instrument to read from a history directory")
+    parser.add_argument("--fast", type=_ints, default=[5, 8, 10, 13])
+    parser.add_argument("--slow", type=_ints, default=[21, 30, 40])
+    parser.add_argument("--strike-offset", type=_ints, default=[-300, -200, -100, 0])
+    parser.add_argument("--trail-pct", type=_floats, default=[0.03, 0.05, 0.08])
+    parser.add_argument("--candle-minutes", type=_ints, default=[3, 5, 15])
+    parser.add_argument("--random", type=int, default=0, help="sample this many combinations instead of the full grid")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--rank-by", default="pnl")
+    parser.add_argument("--lot-size", type=int, default=50)
+    parser.add_argument("--slippage", type=float, default=0.0)
+    parser.add_argument("--cost", type=float, default=0.0)
+    parser.add_argument("--time-value", type=float, default=50.0)
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--out", help="write the full ranked table to this CSV")
+    args = parser.parse_args()
+
+    configs = list(parameter_grid(args.fast, args.slow, args.strike_offset, args.trail_pct, args.candle_minutes))
+    if args.random and args.random < len(configs):
+        configs = random.Random(args.seed).sample(configs, args.random)
+    ts, prices = load_prices(args.prices, args.token)
+    results = sweep(ts, prices, configs, workers=args.workers, rank_by=args.rank_by,
+                    lot_size=args.lot_size, fill=FillModel(args.slippage, args.cost), time_value=args.time_value)
+    if args.out:
+        results.to_csv(args.out, index=False)
+    print(results.head(args.top).to_string())
+
+
+if __name__ == "__main__":
+    main()
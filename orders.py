@@ -0,0 +1,345 @@
+import asyncio
+import hashlib
+import time
+from collections import deque
+
+from metrics import REGISTRY
+from session import Backoff
+
+PLACE_ORDER = REGISTRY.histogram("bot_place_order_seconds", "placeOrder round trip")
+TICK_TO_ORDER_ACK = REGISTRY.histogram("bot_tick_to_order_ack_seconds", "Feed receive to order acknowledgement")
+ORDER_TO_FINAL = REGISTRY.histogram("bot_order_final_seconds", "Order submitted to its final state",
+                                    (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0))
+ORDER_RETRIES = REGISTRY.counter("bot_order_retries_total", "Order sends retried after an error")
+ORDER_FINAL = REGISTRY.counter("bot_orders_final_total", "Orders that reached a final state")
+ORDER_MODIFIES = REGISTRY.counter("bot_order_modifies_total", "Order modifications sent to the broker")
+ORDER_CANCELS = REGISTRY.counter("bot_order_cancels_total", "Order cancellations sent to the broker")
+
+FINAL = ('complete', 'partial', 'rejected', 'cancelled', 'failed')
+
+
+def order_tag(*parts):
+    # Deterministic client tag for one trading intent (16 chars, inside Angel's
+    # 20-char ordertag), so a resend after a timeout or a restart is recognisable.
+    return hashlib.blake2s(":".join(map(str, parts)).encode(), digest_size=8).hexdigest()
+
+
+class RateLimiter:
+    # Token bucket: `rate` sends per second with bursts of up to `rate`.
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = float(rate)
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class RetryBudget:
+    # At most `retries` resends per `window` seconds across all orders, so a broker
+    # outage cannot turn into a retry storm.
+    def __init__(self, retries=10, window=60.0):
+        self.retries = retries
+        self.window = window
+        self.spent = deque()
+
+    def take(self):
+        now = time.monotonic()
+        while self.spent and now - self.spent[0] > self.window:
+            self.spent.popleft()
+        if len(self.spent) >= self.retries:
+            return False
+        self.spent.append(now)
+        return True
+
+
+class OrderManager:
+    # Places orders off the tick path and follows them to a final state. submit()
+    # returns a record at once; the send is rate limited and retried within the
+    # budget. Fills arrive later from update(): pushed by the adapter's order stream
+    # (the paper exchange via observe()) or polled from its order book. on_final(record)
+    # is called once per order when it completes, is rejected or cancelled, or
+    # cannot be sent; one cancelled after a partial fill settles as 'partial', with
+    # the units in record['filled']. Tags make submit() idempotent: one intent, one order.
+    # modify() changes a working order; only the latest change per order is sent,
+    # at most once per modify_interval seconds. cancel() withdraws one; the order
+    # book then settles it as cancelled, or complete if it filled first.
+    def __init__(self, broker, on_final=None, poll_interval=1.0, max_attempts=3, budget=None, modify_interval=1.0):
+        self.broker = broker
+        self.on_final = on_final or (lambda record: None)
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.budget = budget or RetryBudget()
+        self.modify_interval = modify_interval
+        self.orders = {}
+        self.open = {}
+        self.changes = {}
+        self.tasks = set()
+        self.poller = None
+        self.modifier = None
+
+    def get(self, tag):
+        return self.orders.get(tag)
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    def _record(self, tag, token, symbol, side, quantity, order_type="MARKET", price=0.0, trigger_price=0.0,
+                received=None):
+        record = {
+            'tag': tag, 'token': str(token), 'symbol': symbol, 'side': side, 'quantity': quantity,
+            'order_type': order_type, 'price': price, 'trigger_price': trigger_price,
+            'order_id': None, 'status': 'pending', 'filled': 0, 'average_price': None,
+            'attempts': 0, 'error': None, 'tracked': True, 'cancelling': False,
+            'received': received, 'submitted': time.perf_counter(),
+        }
+        self.orders[tag] = record
+        return record
+
+    def submit(self, tag, token, symbol, side, quantity, order_type="MARKET", price=0.0, trigger_price=0.0,
+               received=None, retry=False):
+        record = self.orders.get(tag)
+        if record is not None and record['status'] != 'failed':
+            return record
+        record = self._record(tag, token, symbol, side, quantity, order_type, price, trigger_price, received)
+        if retry and not self.budget.take():
+            # A resend of an intent that already failed counts against the budget too
+            record['error'] = "retry budget exhausted"
+            self._finish(record, 'failed')
+            return record
+        self._spawn(self._send(record))
+        return record
+
+    async def _send(self, record):
+        backoff = Backoff(0.5, 5.0)
+        while True:
+            limiter = self.broker.order_limiter
+            if limiter is not None:
+                await limiter.acquire()
+            record['attempts'] += 1
+            started = time.perf_counter()
+            try:
+                ack = await self.broker.place_order(record['token'], record['symbol'], record['side'],
+                                                    record['quantity'], record['order_type'], record['price'],
+                                                    record['trigger_price'], tag=record['tag'])
+            except Exception as e:
+                record['error'] = f"{type(e).__name__}: {e}"
+                # A timed-out send may still have reached the broker; adopt it rather than send twice,
+                # and never resend without having looked
+                try:
+                    found = await self._find(record['tag'])
+                except Exception as lookup:
+                    record['error'] += f"; not resent: {lookup}"
+                    self._finish(record, 'failed')
+                    return
+                if found is not None:
+                    self._ack(record, found['order_id'])
+                    self.update(found)
+                    return
+                if record['attempts'] >= self.max_attempts or not self.budget.take():
+                    self._finish(record, 'failed')
+                    return
+                ORDER_RETRIES.inc(side=record['side'])
+                await asyncio.sleep(backoff.next())
+                continue
+            finally:
+                PLACE_ORDER.since(started)
+            if record['received'] is not None:
+                TICK_TO_ORDER_ACK.since(record['received'])
+            if ack.get('average_price') is not None:
+                # Adapters that fill synchronously report the price with the ack
+                record.update(order_id=ack['order_id'], filled=record['quantity'], average_price=ack['average_price'])
+                self._finish(record, 'complete')
+                return
+            self._ack(record, ack['order_id'])
+            return
+
+    def _ack(self, record, order_id):
+        record['order_id'] = order_id
+        record['status'] = 'open'
+        if self.broker.streams_orders:
+            self.open[order_id] = record
+        elif order_id is not None and self.broker.reports_orders:
+            self.open[order_id] = record
+            if self.poller is None:
+                self.poller = self._spawn(self._poll())
+        else:
+            # The adapter cannot report fills; the caller settles this order itself
+            record['tracked'] = False
+
+    def _finish(self, record, status):
+        record['status'] = status
+        self.open.pop(record['order_id'], None)
+        ORDER_FINAL.inc(status=status)
+        ORDER_TO_FINAL.since(record['submitted'])
+        self.on_final(record)
+
+    def update(self, update):
+        # {'order_id', 'status', 'filled', 'average_price'} from the broker's order stream or book
+        record = self.open.get(update['order_id'])
+        if record is None:
+            return None
+        record['filled'] = update.get('filled') or record['filled']
+        if update.get('average_price'):
+            record['average_price'] = update['average_price']
+        if update['status'] in FINAL:
+            status = update['status']
+            if status in ('cancelled', 'rejected') and record['filled']:
+                # Withdrawn after some of it filled: those units were bought (or sold) all the same
+                status = 'complete' if record['filled'] >= record['quantity'] else 'partial'
+            self._finish(record, status)
+        return record
+
+    def modify(self, tag, **changes):
+        # price / trigger_price / quantity for a working order
+        record = self.orders.get(tag)
+        if record is None or record['status'] in FINAL:
+            return None
+        self.changes[tag] = {**self.changes.get(tag, {}), **changes}
+        if self.modifier is None:
+            self.modifier = self._spawn(self._modify())
+        return record
+
+    def _requeue(self, tag, changes):
+        # Anything newer for the same order wins over what is put back
+        self.changes[tag] = {**changes, **self.changes.get(tag, {})}
+
+    async def _modify(self):
+        # One batch per interval: a trail that moves on every tick still costs at
+        # most one broker call per order per interval, each through the rate limiter.
+        try:
+            while self.changes:
+                batch, self.changes = self.changes, {}
+                for tag, changes in batch.items():
+                    record = self.orders[tag]
+                    if record['status'] in FINAL:
+                        continue
+                    if record['order_id'] is None:
+                        self._requeue(tag, changes)  # not acknowledged yet
+                        continue
+                    limiter = self.broker.order_limiter
+                    if limiter is not None:
+                        await limiter.acquire()
+                    target = {'quantity': record['quantity'], 'price': record['price'],
+                              'trigger_price': record['trigger_price'], **changes}
+                    try:
+                        await self.broker.modify_order(record['order_id'], record['token'], record['symbol'],
+                                                       target['quantity'], record['order_type'], target['price'],
+                                                       target['trigger_price'])
+                    except Exception as e:
+                        print(f"Error modifying order {record['order_id']}: {e}")
+                        if self.budget.take():
+                            self._requeue(tag, changes)
+                        continue
+                    record.update(changes)
+                    ORDER_MODIFIES.inc(side=record['side'])
+                await asyncio.sleep(self.modify_interval)
+        finally:
+            self.modifier = None
+
+    def cancel(self, tag):
+        # None while the order is not acknowledged yet or a cancel is already on its way
+        record = self.orders.get(tag)
+        if record is None or record['status'] in FINAL or record['order_id'] is None or record['cancelling']:
+            return None
+        record['cancelling'] = True
+        self._spawn(self._cancel(record))
+        return record
+
+    async def _cancel(self, record):
+        limiter = self.broker.order_limiter
+        if limiter is not None:
+            await limiter.acquire()
+        try:
+            await self.broker.cancel_order(record['order_id'], record['order_type'])
+        except Exception as e:
+            print(f"Error cancelling order {record['order_id']}: {e}")
+            if self.budget.take():
+                record['cancelling'] = False  # the caller may ask again
+            return
+        ORDER_CANCELS.inc(side=record['side'])
+        try:
+            found = await self._find(record['tag'])
+        except Exception as e:
+            print(f"Error reading order book: {e}")
+            return  # the poller or the order stream settles it
+        if found is not None:
+            self.update(found)
+
+    async def _find(self, tag):
+        # The book entry with this tag, or None when it is not there. Raises when
+        # the adapter cannot look orders up by tag or its book cannot be read.
+        if not self.broker.tags_orders:
+            raise LookupError(f"{self.broker.name} cannot find orders by tag")
+        book = await self.broker.order_book()
+        for update in book or ():
+            if update.get('tag') == tag:
+                return update
+        return None
+
+    async def _poll(self):
+        try:
+            while self.open:
+                await asyncio.sleep(self.poll_interval)
+                try:
+                    book = await self.broker.order_book()
+                except Exception as e:
+                    print(f"Error polling orders: {e}")
+                    continue
+                # One order book call covers every working order
+                for update in book or ():
+                    self.update(update)
+        finally:
+            self.poller = None
+
+    async def resume(self, tag, token, symbol, side, quantity, order_type="MARKET", price=0.0, trigger_price=0.0):
+        # Re-attach to an order sent before a restart by finding its tag in the order
+        # book. Only a book read without the tag fails it (on_final as usual); while
+        # the book cannot be read it is asked again, and an adapter that cannot find
+        # orders by tag leaves the order open and untracked for the caller to settle.
+        record = self.orders.get(tag)
+        if record is not None:
+            return record
+        record = self._record(tag, token, symbol, side, quantity, order_type, price, trigger_price)
+        record['status'] = 'open'
+        if not self.broker.tags_orders:
+            record['tracked'] = False
+            return record
+        try:
+            found = await self._find(tag)
+        except Exception as e:
+            print(f"Error finding order {tag}: {e}; asking again")
+            self._spawn(self._relocate(record))
+            return record
+        self._resumed(record, found)
+        return record
+
+    def _resumed(self, record, found):
+        if found is None:
+            record['error'] = "not found in the order book after restart"
+            self._finish(record, 'failed')
+            return
+        self._ack(record, found['order_id'])
+        self.update(found)
+
+    async def _relocate(self, record):
+        backoff = Backoff(self.poll_interval, 30.0)
+        while True:
+            await asyncio.sleep(backoff.next())
+            try:
+                found = await self._find(record['tag'])
+            except Exception as e:
+                print(f"Error finding order {record['tag']}: {e}")
+                continue
+            self._resumed(record, found)
+            return
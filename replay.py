@@ -0,0 +1,149 @@
+import argparse
+import asyncio
+import base64
+import json
+import time
+
+import websockets
+
+# Feed capture and a local stand-in for the smart-stream socket. Captures are JSONL
+# lines of {"t": receive time, "m": text frame} or {"t": ..., "b": base64 frame}.
+
+
+class FeedRecorder:
+    def __init__(self, path):
+        self.file = open(path, "a", buffering=1 << 16)
+
+    def record(self, msg):
+        if isinstance(msg, bytes):
+            line = {"t": time.time(), "b": base64.b64encode(msg).decode()}
+        else:
+            line = {"t": time.time(), "m": msg}
+        self.file.write(json.dumps(line, separators=(",", ":")) + "\n")
+
+    def close(self):
+        self.file.close()
+
+
+def load_capture(path):
+    frames = []
+    with open(path, "r") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                break
+            frames.append((rec["t"], base64.b64decode(rec["b"]) if "b" in rec else rec["m"]))
+    return frames
+
+
+def _tick_message(frame):
+    # The decoded "m" message of a text frame, or None when it cannot be inspected.
+    if not isinstance(frame, str):
+        return None
+    try:
+        message = json.loads(frame)
+    except ValueError:
+        return None
+    if message.get("type") != "m":
+        return None
+    return message
+
+
+class ReplayServer:
+    def __init__(self, frames, speed=1.0, filter_subscriptions=True, default_token="256265"):
+        self.frames = frames
+        self.speed = speed
+        self.filter_subscriptions = filter_subscriptions
+        self.default_token = default_token
+        self.stats = {}
+
+    async def _read_control(self, websocket, subscribed, authenticated):
+        async for raw in websocket:
+            try:
+                message = json.loads(raw)
+            except ValueError:
+                continue
+            action = message.get("action")
+            tokens = {str(t) for t in message.get("instrumentToken", [])}
+            if action == "authenticate":
+                authenticated.set()
+                await websocket.send(json.dumps({"type": "auth", "status": "success"}))
+            elif action == "subscribe":
+                subscribed.update(tokens)
+            elif action == "unsubscribe":
+                subscribed.difference_update(tokens)
+
+    def _filter(self, frame, subscribed):
+        message = _tick_message(frame) if self.filter_subscriptions else None
+        if message is None:
+            return frame
+        ticks = [
+            tick for tick in message.get("data", [])
+            if str(tick.get("instrumentToken", tick.get("token", self.default_token))) in subscribed
+        ]
+        if not ticks:
+            return None
+        message["data"] = ticks
+        return json.dumps(message), len(ticks)
+
+    async def handler(self, websocket, path=None):
+        subscribed, authenticated = set(), asyncio.Event()
+        control = asyncio.create_task(self._read_control(websocket, subscribed, authenticated))
+        try:
+            await authenticated.wait()
+            await asyncio.sleep(0.05)  # let the initial subscribe land
+            sent_frames = sent_ticks = 0
+            base = self.frames[0][0] if self.frames else 0.0
+            started = time.perf_counter()
+            for i, (t, frame) in enumerate(self.frames):
+                if self.speed:
+                    delay = (t - base) / self.speed - (time.perf_counter() - started)
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                elif i % 256 == 0:
+                    await asyncio.sleep(0)
+                out = self._filter(frame, subscribed)
+                if out is None:
+                    continue
+                if isinstance(out, tuple):
+                    out, n = out
+                else:
+                    n = 1
+                await websocket.send(out)
+                sent_frames += 1
+                sent_ticks += n
+            elapsed = time.perf_counter() - started
+            self.stats = {
+                "frames": sent_frames,
+                "ticks": sent_ticks,
+                "seconds": elapsed,
+                "ticks_per_sec": sent_ticks / elapsed if elapsed else float("inf"),
+            }
+            print(f"Replay finished: {self.stats}")
+            await websocket.wait_closed()
+        finally:
+            control.cancel()
+
+
+async def serve(path, host, port, speed, filter_subscriptions):
+    server = ReplayServer(load_capture(path), speed, filter_subscriptions)
+    async with websockets.serve(server.handler, host, port, max_size=None):
+        print(f"Replaying {len(server.frames)} frames from {path} on ws://{host}:{port} (speed={speed or 'max'})")
+        await asyncio.Future()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a captured feed over a local WebSocket")
+    parser.add_argument("capture", help="JSONL file written with FEED_CAPTURE")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--speed", default="1", help="playback multiplier, or 'max' for no pacing")
+    parser.add_argument("--no-filter", action="store_true", help="send every frame regardless of subscriptions")
+    args = parser.parse_args()
+    speed = 0.0 if args.speed == "max" else float(args.speed)
+    asyncio.run(serve(args.capture, args.host, args.port, speed, not args.no_filter))
+
+
+if __name__ == "__main__":
+    main()
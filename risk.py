@@ -0,0 +1,165 @@
+import os
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from datetime import date
+
+from metrics import REGISTRY
+from warmup import day_start_ms, ist_day
+
+RISK_CHECK = REGISTRY.histogram("bot_risk_check_seconds", "Pre-trade risk check on an entry",
+                                (0.000001, 0.0000025, 0.000005, 0.00001, 0.000025, 0.00005, 0.0001))
+
+DAY_MS = 24 * 60 * 60 * 1000
+
+
+@dataclass(frozen=True)
+class RiskLimits:
+    # Per strategy; 0 turns a limit off
+    max_daily_loss: float = 0.0  # realized + open P&L for the day; beyond it the kill switch flattens
+    max_orders_per_minute: int = 0  # every order counts, but only entries are refused
+    max_exposure: float = 0.0  # premium x quantity held plus the entry being sent
+    max_trades: int = 0  # entries per day
+    loss_cooldown_minutes: int = 0  # no new entry this long after a losing trade
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_daily_loss=float(os.environ.get("RISK_MAX_DAILY_LOSS", cls.max_daily_loss)),
+            max_orders_per_minute=int(os.environ.get("RISK_MAX_ORDERS_PER_MINUTE", cls.max_orders_per_minute)),
+            max_exposure=float(os.environ.get("RISK_MAX_EXPOSURE", cls.max_exposure)),
+            max_trades=int(os.environ.get("RISK_MAX_TRADES", cls.max_trades)),
+            loss_cooldown_minutes=int(os.environ.get("RISK_LOSS_COOLDOWN_MINUTES", cls.loss_cooldown_minutes)),
+        )
+
+
+REASONS = {
+    'kill_switch': "daily loss limit hit; trading stopped for the day",
+    'max_trades': "daily trade limit reached",
+    'cooldown': "cooling down after a losing trade",
+    'order_rate': "order rate limit reached",
+    'exposure': "entry would exceed the exposure limit",
+}
+
+
+class RiskGate:
+    # Running counters for one strategy's trading day, checked before every entry.
+    # Each check is a handful of comparisons against the counters (the order-rate
+    # window only drops what has aged out), so it costs microseconds on the order
+    # path. Time is the feed's clock: entries pass the bar close, option ticks their
+    # own timestamps, and a replay trips the same limits at any speed. Exits are
+    # counted but never refused. The counters start over on a new IST day.
+    def __init__(self, limits=None):
+        self.limits = limits or RiskLimits.from_env()
+        self.clock = 0
+        self.day = None
+        self.day_end = 0
+        self.realized = 0.0
+        self.unrealized = 0.0
+        self.exposure = 0.0
+        self.entries = 0
+        self.orders = deque()
+        self.killed = None
+        self.cooldown_until = 0
+
+    def _roll(self, now_ms):
+        if now_ms > self.clock:
+            self.clock = now_ms
+        if self.clock < self.day_end:
+            return
+        day = ist_day(self.clock)
+        self.day = day.isoformat()
+        self.day_end = day_start_ms(day) + DAY_MS
+        self.realized = 0.0
+        self.entries = 0
+        self.killed = None
+        self.cooldown_until = 0
+
+    def _recent_orders(self):
+        orders = self.orders
+        while orders and self.clock - orders[0] >= 60000:
+            orders.popleft()
+        return len(orders)
+
+    def check_entry(self, now_ms, exposure=0.0):
+        # None when the entry may go, else a REASONS key. exposure is None when no
+        # premium could be priced, which only matters with an exposure limit.
+        started = time.perf_counter()
+        self._roll(now_ms)
+        limits = self.limits
+        reason = None
+        if self.killed:
+            reason = 'kill_switch'
+        elif limits.max_trades and self.entries >= limits.max_trades:
+            reason = 'max_trades'
+        elif self.clock < self.cooldown_until:
+            reason = 'cooldown'
+        elif limits.max_orders_per_minute and self._recent_orders() >= limits.max_orders_per_minute:
+            reason = 'order_rate'
+        elif limits.max_exposure and (exposure is None or self.exposure + exposure > limits.max_exposure):
+            reason = 'exposure'
+        RISK_CHECK.since(started)
+        return reason
+
+    def record_order(self):
+        self.orders.append(self.clock)
+        if len(self.orders) > 1000:
+            self._recent_orders()
+
+    def opened(self, exposure):
+        # An entry passed check_entry(); its exposure is held until the trade closes
+        self.entries += 1
+        self.exposure += exposure or 0.0
+
+    def filled(self, exposure):
+        self.exposure = exposure
+
+    def released(self):
+        # The entry never filled
+        self.exposure = 0.0
+
+    def _trip(self):
+        limit = self.limits.max_daily_loss
+        if limit and not self.killed and self.realized + self.unrealized <= -limit:
+            self.killed = 'daily_loss'
+            return True
+        return False
+
+    def mark(self, now_ms, unrealized):
+        # Open P&L at an option tick; True when it trips the kill switch
+        self._roll(now_ms)
+        self.unrealized = unrealized
+        return self._trip()
+
+    def closed(self, pnl):
+        # True when the realized loss trips the kill switch
+        self._roll(self.clock)
+        self.realized += pnl
+        self.unrealized = 0.0
+        self.exposure = 0.0
+        if pnl < 0 and self.limits.loss_cooldown_minutes:
+            self.cooldown_until = self.clock + self.limits.loss_cooldown_minutes * 60000
+        return self._trip()
+
+    def counters(self):
+        return {'day': self.day, 'clock': self.clock, 'realized': self.realized, 'unrealized': self.unrealized,
+                'exposure': self.exposure, 'entries': self.entries, 'orders': list(self.orders),
+                'killed': self.killed, 'cooldown_until': self.cooldown_until}
+
+    def restore(self, counters):
+        # From the state journal; a new day starts over at the first check
+        if not counters:
+            return
+        self.clock = counters.get('clock') or 0
+        self.day = counters.get('day')
+        self.day_end = day_start_ms(date.fromisoformat(self.day)) + DAY_MS if self.day else 0
+        self.realized = counters.get('realized', 0.0)
+        self.unrealized = counters.get('unrealized', 0.0)
+        self.exposure = counters.get('exposure', 0.0)
+        self.entries = counters.get('entries', 0)
+        self.orders = deque(counters.get('orders') or ())
+        self.killed = counters.get('killed')
+        self.cooldown_until = counters.get('cooldown_until', 0)
+
+    def status(self):
+        return {'limits': asdict(self.limits), **self.counters()}
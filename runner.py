@@ -0,0 +1,95 @@
+import asyncio
+from dataclasses import asdict
+
+from hub import FeedHub
+
+
+class StrategyRunner:
+    # Named strategies on one event loop. Strategies that read the same feed broker
+    # share one FeedHub, so dozens of strategies cost one socket. Each keeps its own
+    # state file, position and order broker (account), and can be started or
+    # stopped while the others keep trading.
+    def __init__(self, capture=None, history=None):
+        self.capture = capture
+        self.history = history
+        self.strategies = {}
+        self.hubs = {}
+        self.hub_tasks = {}
+        self.ready = set()
+
+    @staticmethod
+    def feed_of(broker):
+        # Paper brokers read their source's feed
+        return getattr(broker, 'source', None) or broker
+
+    async def prepare(self, broker):
+        # Login and instrument master once per broker, however many strategies use it
+        if broker in self.ready:
+            return
+        await broker.login()
+        try:
+            await broker.load_instruments()
+        except Exception as e:
+            print(f"Error fetching instruments: {e}")
+        self.ready.add(broker)
+
+    async def start(self, engine, feed=None):
+        if engine.name in self.strategies:
+            raise ValueError(f"Strategy {engine.name} is already running")
+        feed = feed or self.feed_of(engine.broker)
+        await self.prepare(feed)
+        await self.prepare(self.feed_of(engine.broker))
+        engine.load_state()
+        await engine.warm_up(self.history)
+        await engine.resume_orders()
+        hub = self.hubs.get(feed)
+        if hub is None:
+            # Only the first hub records, so a capture or history holds one feed
+            first = not self.hub_tasks
+            hub = self.hubs[feed] = FeedHub(feed, self.capture if first else None, self.history if first else None)
+            self.hub_tasks[feed] = asyncio.create_task(hub.run())
+        await hub.attach(engine)
+        self.strategies[engine.name] = (engine, hub)
+        engine.notify("info", f"Strategy {engine.name} started")
+        return engine
+
+    async def stop(self, name):
+        engine, hub = self.strategies.pop(name)
+        await hub.detach(engine)
+        engine.save_state()
+        if not hub.engines:
+            task = self.hub_tasks.pop(hub.broker)
+            del self.hubs[hub.broker]
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        engine.notify("info", f"Strategy {name} stopped")
+        return engine
+
+    def describe(self):
+        rows = []
+        for name, (engine, hub) in self.strategies.items():
+            rows.append({
+                'name': name,
+                'broker': engine.broker.name,
+                'paper': engine.broker.paper,
+                'expiry_date': engine.expiry_date,
+                'lot_size': engine.lot_size,
+                'config': asdict(engine.config),
+                'position': engine.state.get('position'),
+                'risk': engine.risk.status(),
+                'connected': hub.feed is not None,
+                'queue': engine.tick_queue.stats() if engine.tick_queue is not None else None,
+            })
+        return rows
+
+    async def close(self):
+        for name in list(self.strategies):
+            await self.stop(name)
+
+    async def run_forever(self):
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await self.close()
+            if self.history is not None:
+                self.history.close()
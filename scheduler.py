@@ -0,0 +1,30 @@
+import asyncio
+import os
+import time
+
+GRACE = float(os.environ.get("BAR_CLOSE_GRACE", 0.25))  # seconds past the boundary for ticks still in flight
+
+
+class BarClose:
+    # Queued to the strategy task at a bar boundary, in line with the ticks before it.
+    __slots__ = ('ts_ms',)
+
+    def __init__(self, ts_ms):
+        self.ts_ms = ts_ms
+
+
+class BarClock:
+    # Calls on_boundary(epoch ms) at every `minutes` boundary of the CandleStore
+    # bucket grid, whether or not a tick has arrived. Each sleep is taken from the
+    # wall clock again, so the wake-ups never drift.
+    def __init__(self, minutes, on_boundary, grace=GRACE):
+        self.bucket_ms = minutes * 60000
+        self.on_boundary = on_boundary
+        self.grace = grace
+
+    async def run(self):
+        while True:
+            now_ms = time.time() * 1000
+            boundary = int(now_ms - now_ms % self.bucket_ms) + self.bucket_ms
+            await asyncio.sleep((boundary - now_ms) / 1000 + self.grace)
+            self.on_boundary(boundary)
@@ -0,0 +1,42 @@
+import asyncio
+import random
+import time
+
+
+class Backoff:
+    # Exponential backoff with full jitter: the n-th retry sleeps U(0, min(cap, base * factor**n)).
+    def __init__(self, base=1.0, cap=60.0, factor=2.0):
+        self.base = base
+        self.cap = cap
+        self.factor = factor
+        self.attempts = 0
+
+    def next(self):
+        delay = random.uniform(0, min(self.cap, self.base * self.factor ** self.attempts))
+        self.attempts += 1
+        return delay
+
+    def reset(self):
+        self.attempts = 0
+
+
+async def supervise(connect, backoff=None, healthy_after=60.0, on_retry=None):
+    # Run connect() forever, reconnecting after it fails or returns. A session that
+    # stayed up for healthy_after seconds resets the backoff. Cancellation stops it.
+    backoff = backoff or Backoff()
+    while True:
+        started = time.monotonic()
+        try:
+            await connect()
+            reason = "connection closed"
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            reason = f"{type(e).__name__}: {e}"
+        if time.monotonic() - started >= healthy_after:
+            backoff.reset()
+        delay = backoff.next()
+        print(f"Feed session ended ({reason}); reconnecting in {delay:.1f}s")
+        if on_retry is not None:
+            on_retry(reason)
+        await asyncio.sleep(delay)
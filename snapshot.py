@@ -0,0 +1,134 @@
+import os
+import struct
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+from decoders import loads
+
+try:
+    import orjson
+
+    def dumps(value):
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+except ImportError:
+    import json
+
+    def dumps(value):
+        return json.dumps(value, default=str, separators=(",", ":")).encode()
+
+# Latest engine snapshot in a named shared-memory segment: an 8-byte sequence, the
+# 4-byte length and the writer's pid, then the JSON payload. Seqlock: the sequence
+# is odd while the writer is mid-update, so a reader retries instead of taking a
+# torn snapshot. A segment whose writer pid is gone was left by a killed process.
+HEADER = struct.Struct("<QII")
+SIZE = 1 << 18
+
+
+def segment_name(name):
+    return f"mabot_{name}"
+
+
+def pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # someone else's process
+    return True
+
+
+def _attach(name):
+    # None when there is no segment under this name
+    try:
+        shm = shared_memory.SharedMemory(segment_name(name))
+    except FileNotFoundError:
+        return None
+    try:
+        # Before Python 3.13 the tracker would unlink the writer's segment when this reader exits
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+    return shm
+
+
+def writer_pid(name):
+    # The pid of the process that created the segment; None when there is none
+    shm = _attach(name)
+    if shm is None:
+        return None
+    try:
+        return HEADER.unpack_from(shm.buf, 0)[2]
+    finally:
+        shm.close()
+
+
+def running(name):
+    # True while a live process publishes under this name
+    pid = writer_pid(name)
+    return pid is not None and pid_alive(pid)
+
+
+def unlink_stale(name):
+    # Remove the segment of a writer that died without cleaning up; True if one was removed
+    try:
+        shm = shared_memory.SharedMemory(segment_name(name))
+    except FileNotFoundError:
+        return False
+    try:
+        if pid_alive(HEADER.unpack_from(shm.buf, 0)[2]):
+            resource_tracker.unregister(shm._name, "shared_memory")
+            return False
+        shm.unlink()  # also drops it from the tracker
+        return True
+    finally:
+        shm.close()
+
+
+class SnapshotWriter:
+    def __init__(self, name, size=SIZE):
+        if running(name):
+            raise RuntimeError(f"Snapshot {name} is being published by running process {writer_pid(name)}")
+        unlink_stale(name)
+        self.pid = os.getpid()
+        self.shm = shared_memory.SharedMemory(segment_name(name), create=True, size=size)
+        self.seq = 0
+        HEADER.pack_into(self.shm.buf, 0, self.seq, 0, self.pid)
+
+    def write(self, value):
+        payload = dumps(value)
+        if HEADER.size + len(payload) > self.shm.size:
+            raise ValueError(f"Snapshot of {len(payload)} bytes does not fit the segment")
+        buf = self.shm.buf
+        self.seq += 1
+        HEADER.pack_into(buf, 0, self.seq, 0, self.pid)
+        buf[HEADER.size:HEADER.size + len(payload)] = payload
+        self.seq += 1
+        HEADER.pack_into(buf, 0, self.seq, len(payload), self.pid)
+
+    def close(self):
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def read_snapshot(name, retries=100):
+    # None when there is no segment under this name; a crashed writer's last
+    # snapshot is still returned, see running().
+    shm = _attach(name)
+    if shm is None:
+        return None
+    try:
+        buf = shm.buf
+        for _ in range(retries):
+            seq, size, _ = HEADER.unpack_from(buf, 0)
+            if seq and seq % 2 == 0:
+                payload = bytes(buf[HEADER.size:HEADER.size + size])
+                if HEADER.unpack_from(buf, 0)[0] == seq:
+                    return loads(payload)
+            time.sleep(0.001)
+        return None
+    finally:
+        shm.close()
@@ -0,0 +1,97 @@
+import math
+import os
+from dataclasses import dataclass
+
+# Pure strategy rules shared by the live bot and the backtester.
+
+
+@dataclass(frozen=True)
+class StrategyConfig:
+    fast: int = 10
+    slow: int = 21
+    strike_offset: int = -200
+    trail_pct: float = 0.05
+    candle_minutes: int = 5
+    # Strike by the live option chain instead of strike_offset: the call nearest
+    # target_delta, within the premium band when premium_max is set
+    target_delta: float = 0.0
+    premium_min: float = 0.0
+    premium_max: float = 0.0
+
+    @property
+    def trail_factor(self):
+        return 1 - self.trail_pct
+
+    @property
+    def uses_chain(self):
+        return bool(self.target_delta or self.premium_max)
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            fast=int(os.environ.get("FAST_MA", cls.fast)),
+            slow=int(os.environ.get("SLOW_MA", cls.slow)),
+            strike_offset=int(os.environ.get("STRIKE_OFFSET", cls.strike_offset)),
+            trail_pct=float(os.environ.get("TRAIL_PCT", cls.trail_pct)),
+            candle_minutes=int(os.environ.get("CANDLE_MINUTES", cls.candle_minutes)),
+            target_delta=float(os.environ.get("TARGET_DELTA", cls.target_delta)),
+            premium_min=float(os.environ.get("PREMIUM_MIN", cls.premium_min)),
+            premium_max=float(os.environ.get("PREMIUM_MAX", cls.premium_max)),
+        )
+
+
+DEFAULT_CONFIG = StrategyConfig()
+
+def round_strike(price, interval=50):
+    return int(price // interval * interval)
+
+def update_candles_ms(candles, ts_ms, price, minutes=5):
+    # Candles bucketed on epoch-ms ints.
+    start = ts_ms - ts_ms % (minutes * 60000)
+    if not candles or candles[-1]['timestamp'] != start:
+        candles.append({"timestamp": start, "open": price, "high": price, "low": price, "close": price})
+    else:
+        c = candles[-1]
+        if price > c['high']:
+            c['high'] = price
+        elif price < c['low']:
+            c['low'] = price
+        c['close'] = price
+    return candles
+
+def entry_signal(indicators, state):
+    # The last closed candle when the fast MA is at or above the slow MA and we
+    # have neither a position nor a trade on that candle already.
+    last = indicators.last
+    if (indicators.ready and last['ma_fast'] >= last['ma_slow'] and
+            state.get('traded_candle') != last['timestamp'] and not state.get('position')):
+        return last
+    return None
+
+def entry_strike(last, config=DEFAULT_CONFIG):
+    return round_strike(last['close']) + config.strike_offset
+
+def new_position(opt_token, opt_symbol, entry_price, config=DEFAULT_CONFIG):
+    return {
+        'option_token': opt_token,
+        'tradingsymbol': opt_symbol,
+        'entry_price': entry_price,
+        'sl_price': entry_price * config.trail_factor if entry_price is not None else None,
+        'max_price': entry_price
+    }
+
+def fill_position(position, price, config=DEFAULT_CONFIG):
+    position.update(entry_price=price, sl_price=price * config.trail_factor, max_price=price)
+
+def stop_trigger(sl_price, tick=0.05):
+    # The stop rounded down onto the exchange's price tick, for a sell-stop trigger
+    return round(math.floor(sl_price / tick + 1e-9) * tick, 2)
+
+def trail_position(position, ltp_opt, config=DEFAULT_CONFIG):
+    # Ratchet the trailing stop; returns (stop moved, stop hit).
+    moved = False
+    if ltp_opt > position['max_price']:
+        position['max_price'] = ltp_opt
+        position['sl_price'] = max(position['sl_price'], ltp_opt * config.trail_factor)
+        moved = True
+    return moved, ltp_opt <= position['sl_price']
@@ -0,0 +1,38 @@
+import os
+from datetime import date
+
+from brokers import PaperBroker
+from engine import Engine
+from instruments import InstrumentMaster
+from strategy import StrategyConfig
+from warmup import CandleCache
+
+UNDERLYING = "256265"
+EXPIRY = "2024-01-04"
+LOT_SIZE = 50
+START_MS = 1704166200000  # 2024-01-02 09:00 IST, a bucket boundary
+
+
+def option_rows():
+    rows = []
+    for strike in range(20000, 23050, 50):
+        for option_type in ('CE', 'PE'):
+            symbol = f"NIFTY{EXPIRY.replace('-', '')}{strike}{option_type}"
+            rows.append([EXPIRY, float(strike), option_type, str(100000 + len(rows)), symbol])
+    return rows
+
+
+def paper_engine(directory, risk=None, config=None):
+    # An offline engine: paper broker without a live source, state under `directory`,
+    # no warm-up. Notifications collect in engine.events.
+    directory = str(directory)
+    instruments = InstrumentMaster(os.path.join(directory, "instruments_nfo"), None)
+    instruments.build(option_rows())
+    instruments.day = date.today().isoformat()
+    events = []
+    engine = Engine(PaperBroker(None, instruments, UNDERLYING), EXPIRY, LOT_SIZE,
+                    config or StrategyConfig(candle_minutes=5), os.path.join(directory, "bot_state.json"),
+                    notify=lambda kind, message: events.append((kind, message)), risk=risk,
+                    candle_cache=CandleCache(os.path.join(directory, "candle_cache"), days=0))
+    engine.events = events
+    return engine
@@ -0,0 +1,118 @@
+import asyncio
+import json
+
+import pyotp
+import pytest
+import websockets
+
+from brokers import SmartConnectBroker
+from gateway import BrokerGateway
+from session import Backoff, supervise
+
+SECRET = pyotp.random_base32()
+
+
+class Client:
+    # SmartConnect's session calls: each login or refresh stores a new JWT
+    def __init__(self, refresh_works=True):
+        self.refresh_works = refresh_works
+        self.calls = []
+        self.issued = 0
+        self.access_token = None
+        self.refresh_token = None
+
+    def issue(self):
+        self.issued += 1
+        self.access_token = f"jwt-{self.issued}"
+
+    def generateSession(self, client_code, password, totp):
+        assert pyotp.TOTP(SECRET).verify(totp, valid_window=1)
+        self.calls.append("generateSession")
+        self.issue()
+        self.refresh_token = f"refresh-{self.issued}"
+        return {'status': True}
+
+    def generateToken(self, refresh_token):
+        self.calls.append("generateToken")
+        if not self.refresh_works:
+            raise TypeError("'NoneType' object is not subscriptable")
+        assert refresh_token == self.refresh_token
+        self.issue()
+        return {'status': True}
+
+
+async def connect_until_ticks(broker, valid):
+    # Feed server that drops a connection authenticating with a token not in `valid`
+    tokens = []
+
+    async def handler(websocket, path=None):
+        auth = json.loads(await websocket.recv())
+        tokens.append(auth['data']['accessToken'])
+        if auth['data']['accessToken'] not in valid:
+            await websocket.close(4001, "Invalid token")
+            return
+        await websocket.send(json.dumps({"type": "m", "data": [{"timestamp": 1, "lastprice": 21500.0}]}))
+        await websocket.wait_closed()
+
+    received = asyncio.Event()
+
+    async def session():
+        async with broker.open_feed() as feed:
+            await feed.recv()
+            received.set()
+            await asyncio.Event().wait()
+
+    async with websockets.serve(handler, "127.0.0.1", 0) as server:
+        broker.ws_url = f"ws://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+        await broker.login()
+        task = asyncio.create_task(supervise(session, Backoff(0.01, 0.01)))
+        try:
+            await asyncio.wait_for(received.wait(), 5)
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+    return tokens
+
+
+def smartconnect(client):
+    return SmartConnectBroker(BrokerGateway(client), "key", "C123", "pw", totp_secret=SECRET)
+
+
+def test_reconnect_after_auth_failure_refreshes_the_token():
+    client = Client()
+    broker = smartconnect(client)
+    try:
+        tokens = asyncio.run(connect_until_ticks(broker, {"jwt-2"}))
+    finally:
+        broker.shutdown()
+    assert tokens == ["jwt-1", "jwt-2"]
+    assert client.calls == ["generateSession", "generateToken"]
+
+
+def test_reconnect_logs_in_again_when_the_refresh_fails():
+    client = Client(refresh_works=False)
+    broker = smartconnect(client)
+    try:
+        tokens = asyncio.run(connect_until_ticks(broker, {"jwt-2"}))
+    finally:
+        broker.shutdown()
+    assert tokens == ["jwt-1", "jwt-2"]
+    assert client.calls == ["generateSession", "generateToken", "generateSession"]
+
+
+def test_login_sends_a_totp():
+    client = Client()
+    broker = SmartConnectBroker(BrokerGateway(client), "key", "C123", "pw", totp="123456")
+
+    async def run():
+        await broker.login()
+
+    client.generateSession = lambda *args: client.calls.append(args)
+    try:
+        asyncio.run(run())
+        # A code given instead of a secret is spent by the first login
+        with pytest.raises(ValueError):
+            asyncio.run(run())
+    finally:
+        broker.shutdown()
+    assert client.calls == [("C123", "pw", "123456")]
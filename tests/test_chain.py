@@ -0,0 +1,97 @@
+import math
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+import chain
+from chain import OptionChain, call_greeks, call_price, expiry_ms, implied_vol, norm_cdf
+
+SPOT = 21530.0
+YEARS = 3 / 365
+RATE = 0.07
+STRIKES = SPOT - SPOT % 50 + 50 * np.arange(-20, 21)
+
+
+def smile(strikes):
+    return 0.12 + 0.00002 * np.abs(strikes - SPOT)
+
+
+def test_norm_cdf_matches_erf():
+    x = np.linspace(-6, 6, 241)
+    exact = np.array([0.5 * (1 + math.erf(v / math.sqrt(2))) for v in x])
+    assert np.max(np.abs(norm_cdf(x) - exact)) < 1.5e-7
+
+
+def test_call_price_put_call_parity_and_bounds():
+    price, _ = call_price(SPOT, STRIKES, YEARS, RATE, smile(STRIKES))
+    intrinsic = np.maximum(SPOT - STRIKES * math.exp(-RATE * YEARS), 0)
+    assert np.all(price >= intrinsic - 1e-6) and np.all(price <= SPOT)
+    # Deep in the money the call is worth its discounted intrinsic value
+    deep, _ = call_price(SPOT, np.array([15000.0]), YEARS, RATE, 0.12)
+    assert deep[0] == pytest.approx(SPOT - 15000.0 * math.exp(-RATE * YEARS), abs=1e-4)
+
+
+def test_implied_vol_round_trip():
+    sigma = smile(STRIKES)
+    prices, _ = call_price(SPOT, STRIKES, YEARS, RATE, sigma)
+    solved = implied_vol(prices, SPOT, STRIKES, YEARS, RATE)
+    repriced, _ = call_price(SPOT, STRIKES, YEARS, RATE, solved)
+    assert np.all(np.isfinite(solved))
+    assert np.max(np.abs(repriced - prices)) < 1e-3
+    # Where the option has time value to speak of, the vol itself comes back
+    time_value = prices - np.maximum(SPOT - STRIKES * math.exp(-RATE * YEARS), 0)
+    assert np.max(np.abs(solved - sigma)[time_value > 1]) < 1e-3
+
+
+def test_implied_vol_warm_start_agrees():
+    sigma = smile(STRIKES)
+    prices, _ = call_price(SPOT, STRIKES, YEARS, RATE, sigma)
+    cold = implied_vol(prices, SPOT, STRIKES, YEARS, RATE)
+    warm = implied_vol(prices * 1.01, SPOT, STRIKES, YEARS, RATE, guess=cold)
+    repriced, _ = call_price(SPOT, STRIKES, YEARS, RATE, warm)
+    assert np.max(np.abs(repriced - prices * 1.01)) < 1e-3
+
+
+def test_implied_vol_nan_outside_no_arbitrage_bounds():
+    strikes = np.array([21000.0, 21500.0, 22000.0, 22000.0, 21500.0])
+    intrinsic = SPOT - 21000.0 * math.exp(-RATE * YEARS)
+    prices = np.array([intrinsic - 5, SPOT + 1, 0.0, np.nan, 80.0])
+    solved = implied_vol(prices, SPOT, strikes, YEARS, RATE)
+    assert np.all(np.isnan(solved[:4]))
+    assert np.isfinite(solved[4])
+    assert np.all(np.isnan(implied_vol(np.array([80.0]), SPOT, np.array([21500.0]), 0.0, RATE)))
+
+
+def test_delta_matches_finite_difference():
+    sigma = smile(STRIKES)
+    h = 0.5
+    up, _ = call_price(SPOT + h, STRIKES, YEARS, RATE, sigma)
+    down, _ = call_price(SPOT - h, STRIKES, YEARS, RATE, sigma)
+    delta = call_greeks(SPOT, STRIKES, YEARS, RATE, sigma)['delta']
+    assert np.max(np.abs(delta - (up - down) / (2 * h))) < 1e-4
+    assert np.all(np.diff(delta) < 0)
+
+
+def test_chain_selects_by_delta_and_premium():
+    expiry = "2024-01-04"
+    now_ms = expiry_ms(expiry) - 3 * 24 * 60 * 60 * 1000
+    chain = OptionChain(expiry, width=20, rate=RATE)
+    chain.set_contracts([(k, str(i), None) for i, k in enumerate(STRIKES)])
+    years = (chain.expiry_ms - now_ms) / (365 * 24 * 60 * 60 * 1000)
+    prices, _ = call_price(SPOT, chain.strikes, years, RATE, smile(chain.strikes))
+    for token, price in zip(chain.tokens, np.round(prices, 2)):
+        chain.update(token, now_ms, price)
+    delta = call_greeks(SPOT, chain.strikes, years, RATE, smile(chain.strikes))['delta']
+
+    strike = chain.select(SPOT, target_delta=0.35, now_ms=now_ms)
+    assert strike == chain.strikes[np.argmin(np.abs(delta - 0.35))]
+    strike = chain.select(SPOT, premium_min=40, premium_max=60, now_ms=now_ms)
+    assert 40 <= chain.ltp[list(chain.strikes).index(strike)] <= 60
+
+
+def test_chain_imports_without_the_broker_layer():
+    code = "import sys, chain; assert not {'brokers', 'websockets'} & set(sys.modules), sorted(sys.modules)"
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=os.path.dirname(chain.__file__))
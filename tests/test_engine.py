@@ -0,0 +1,124 @@
+import asyncio
+
+from decoders import Tick
+from strategy import fill_position, new_position
+from tests.helpers import EXPIRY, START_MS, UNDERLYING, paper_engine
+
+
+class RecordingFeed:
+    def __init__(self):
+        self.calls = []
+
+    async def subscribe(self, tokens):
+        self.calls.append(('subscribe', list(tokens)))
+
+    async def unsubscribe(self, tokens):
+        self.calls.append(('unsubscribe', list(tokens)))
+
+
+async def tick(engine, option_tick):
+    # An option tick as process_ticks handles it: fills first, then the strategy
+    for update in engine.broker.observe(option_tick):
+        engine.orders.update(update)
+    await engine.on_option_tick(option_tick)
+    await asyncio.sleep(0)
+
+
+def ohlc(bar):
+    return bar['open'], bar['high'], bar['low'], bar['close']
+
+
+def test_on_tick_ignores_other_tokens(tmp_path):
+    engine = paper_engine(tmp_path)
+
+    async def run():
+        await engine.on_tick(Tick(UNDERLYING, START_MS, 21500.0))
+        await engine.on_tick(Tick("100001", START_MS + 1000, 120.0))
+        await engine.on_tick(Tick(UNDERLYING, START_MS + 2000, 21510.0))
+
+    asyncio.run(run())
+    assert ohlc(engine.series().bar) == (21500.0, 21510.0, 21500.0, 21510.0)
+
+
+def test_stale_option_ticks_stay_out_of_candles(tmp_path):
+    # Ticks for an option unsubscribed a moment ago still arrive; they are dropped
+    engine = paper_engine(tmp_path)
+    feed = RecordingFeed()
+
+    async def run():
+        queue = engine.open_queue()
+        task = asyncio.create_task(engine.process_ticks(feed, queue))
+        ticks = [Tick(UNDERLYING, START_MS, 21500.0), Tick("100001", START_MS + 500, 95.0),
+                 Tick(UNDERLYING, START_MS + 1000, 21490.0), Tick("100001", START_MS + 1500, 30000.0)]
+        for tick in ticks:
+            engine.enqueue(tick, None)
+        while len(queue):
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(run())
+    assert ohlc(engine.series().bar) == (21500.0, 21500.0, 21490.0, 21490.0)
+    assert feed.calls == []
+
+
+def test_restart_without_tag_lookup_keeps_orders_in_flight(tmp_path):
+    # The adapter cannot find the previous process's orders by tag: the entry and the
+    # exit it sent are settled at the next option tick, never failed and never resent
+    engine = paper_engine(tmp_path)
+    token, symbol = asyncio.run(engine.broker.option_contract(21300, EXPIRY, 'CE'))
+    engine.load_state()
+    position = new_position(token, symbol, None, engine.config)
+    position['entry_order'] = "entry1"
+    engine.journal.append_position(position)
+
+    def restart():
+        restarted = paper_engine(tmp_path)
+        restarted.broker.tags_orders = False
+        restarted.load_state()
+        asyncio.run(restarted.resume_orders())
+        assert restarted.state['position'] is not None
+        return restarted
+
+    engine = restart()
+    asyncio.run(tick(engine, Tick(token, START_MS, 300.0)))
+    assert engine.state['position']['entry_price'] == 300.0
+
+    fill_position(position, 300.0, engine.config)
+    position['exit_order'] = "exit1"
+    engine.journal.append_position(position)
+    engine = restart()
+    asyncio.run(tick(engine, Tick(token, START_MS + 1000, 290.0)))
+    assert engine.state['position'] is None
+    assert engine.broker.exchange.orders == {}
+    assert engine.events[-1] == ("pnl", "[PAPER] Trade exited @ 290.0. P&L = -500.0")
+
+
+def test_entry_cancelled_after_a_partial_fill_keeps_the_filled_units(tmp_path):
+    engine = paper_engine(tmp_path)
+    engine.broker.exchange.liquidity = 20  # 20 units per tick
+
+    async def run():
+        token, symbol = await engine.broker.option_contract(21300, EXPIRY, 'CE')
+        engine.load_state()
+        position = engine.state['position'] = new_position(token, symbol, None, engine.config)
+        position['entry_order'] = "entry1"
+        engine.place_order(token, symbol, "BUY", "entry1")
+        ts = START_MS
+        for ltp in (300.0, 300.0):  # sent at the first, 20 filled at the second
+            ts += 1000
+            await tick(engine, Tick(token, ts, ltp))
+        engine.orders.cancel("entry1")
+        await asyncio.sleep(0.01)
+        assert (position['entry_price'], position['quantity']) == (300.0, 20)
+        for ltp in (300.0, 300.0, 280.0, 280.0):  # the stop for the 20 units fills below 285
+            ts += 1000
+            await tick(engine, Tick(token, ts, ltp))
+
+    asyncio.run(run())
+    orders = [(o['side'], o['order_type'], o['quantity'], o['filled'], o['status'])
+              for o in engine.broker.exchange.orders.values()]
+    assert orders == [('BUY', 'MARKET', 50, 20, 'cancelled'), ('SELL', 'MARKET', 20, 20, 'complete')]
+    assert engine.state['position'] is None
+    assert engine.events[-1] == ("pnl", "[PAPER] Trade exited @ 280.0. P&L = -400.0")
@@ -0,0 +1,68 @@
+import math
+import random
+
+import pandas as pd
+import pytest
+
+from indicators import MovingAverages
+
+MINUTES = 5
+START_MS = 1704166200000  # 2024-01-02 09:00 IST, a bucket boundary
+
+
+def add_tick(candles, ts_ms, price):
+    # The bots' candle update: a new bucket opens a candle, a tick inside one moves it
+    start = ts_ms - ts_ms % (MINUTES * 60000)
+    if not candles or candles[-1]['timestamp'] != start:
+        candles.append({'timestamp': start, 'open': price, 'high': price, 'low': price, 'close': price})
+    else:
+        c = candles[-1]
+        c['high'] = max(c['high'], price)
+        c['low'] = min(c['low'], price)
+        c['close'] = price
+
+
+def assert_matches(value, expected):
+    if math.isnan(expected):
+        assert value is None
+    else:
+        assert value == pytest.approx(expected, rel=1e-12, abs=1e-9)
+
+
+@pytest.mark.parametrize("seed", [1, 2])
+def test_moving_averages_match_pandas_rolling(seed):
+    # After every tick, `last` must be df.iloc[-2] of the old per-tick rolling frame
+    rng = random.Random(seed)
+    candles = []
+    ma = MovingAverages(10, 21)
+    ts, price = START_MS, 21000.0
+    for _ in range(1500):
+        ts += rng.choice((1, 200, 5000, 30000, 90000, 400000))
+        price = round(price + rng.gauss(0, 5), 2)
+        add_tick(candles, ts, price)
+        ma.update(candles)
+        if len(candles) < 2:
+            assert ma.last is None
+            continue
+        df = pd.DataFrame(candles)
+        df['ma10'] = df['close'].rolling(10).mean()
+        df['ma21'] = df['close'].rolling(21).mean()
+        expected = df.iloc[-2]
+        assert ma.last['timestamp'] == expected['timestamp']
+        assert ma.last['close'] == expected['close']
+        assert_matches(ma.last['ma_fast'], expected['ma10'])
+        assert_matches(ma.last['ma_slow'], expected['ma21'])
+
+
+def test_seed_matches_pandas_rolling():
+    # A restart seeds from saved candles; the forming one stays open
+    rng = random.Random(9)
+    candles = []
+    for i in range(60):
+        add_tick(candles, START_MS + i * MINUTES * 60000, round(21000 + rng.gauss(0, 50), 2))
+    ma = MovingAverages(10, 21)
+    ma.seed(candles)
+    df = pd.DataFrame(candles)
+    assert ma.last['timestamp'] == candles[-2]['timestamp']
+    assert_matches(ma.last['ma_fast'], df['close'].rolling(10).mean().iloc[-2])
+    assert_matches(ma.last['ma_slow'], df['close'].rolling(21).mean().iloc[-2])
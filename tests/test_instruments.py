@@ -0,0 +1,75 @@
+import asyncio
+
+from brokers import SmartConnectBroker
+from gateway import BrokerGateway
+from instruments import InstrumentMaster, scrip_master_rows, smartapi_rows
+
+# As in Angel's OpenAPIScripMaster.json
+SCRIPS = [
+    {"token": "35003", "symbol": "NIFTY04JAN2421500CE", "name": "NIFTY", "expiry": "04JAN2024",
+     "strike": "2150000.000000", "lotsize": "50", "instrumenttype": "OPTIDX", "exch_seg": "NFO", "tick_size": "5.000000"},
+    {"token": "35004", "symbol": "NIFTY04JAN2421500PE", "name": "NIFTY", "expiry": "04JAN2024",
+     "strike": "2150000.000000", "lotsize": "50", "instrumenttype": "OPTIDX", "exch_seg": "NFO", "tick_size": "5.000000"},
+    {"token": "35011", "symbol": "NIFTY04JAN2421550CE", "name": "NIFTY", "expiry": "04JAN2024",
+     "strike": "2155000.000000", "lotsize": "50", "instrumenttype": "OPTIDX", "exch_seg": "NFO", "tick_size": "5.000000"},
+    {"token": "40001", "symbol": "BANKNIFTY04JAN2447000CE", "name": "BANKNIFTY", "expiry": "04JAN2024",
+     "strike": "4700000.000000", "lotsize": "15", "instrumenttype": "OPTIDX", "exch_seg": "NFO", "tick_size": "5.000000"},
+    {"token": "35100", "symbol": "NIFTY25JANFUT", "name": "NIFTY", "expiry": "25JAN2024",
+     "strike": "-1.000000", "lotsize": "50", "instrumenttype": "FUTIDX", "exch_seg": "NFO", "tick_size": "5.000000"},
+    {"token": "26000", "symbol": "Nifty 50", "name": "NIFTY", "expiry": "", "strike": "0.000000",
+     "lotsize": "1", "instrumenttype": "AMXIDX", "exch_seg": "NSE", "tick_size": "0.000000"},
+]
+
+
+class Response:
+    def __init__(self, data):
+        self.data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.data
+
+
+class Session:
+    def __init__(self):
+        self.requests = []
+
+    def get(self, url, timeout=None):
+        self.requests.append((url, timeout))
+        return Response(SCRIPS)
+
+
+def test_scrip_master_rows_keep_index_options():
+    assert scrip_master_rows(SCRIPS) == [
+        ["2024-01-04", 21500.0, "CE", "35003", "NIFTY04JAN2421500CE"],
+        ["2024-01-04", 21500.0, "PE", "35004", "NIFTY04JAN2421500PE"],
+        ["2024-01-04", 21550.0, "CE", "35011", "NIFTY04JAN2421550CE"],
+    ]
+
+
+def test_contract_lookup_downloads_once_a_day_through_the_gateway(tmp_path):
+    gateway = BrokerGateway(object())
+    gateway.session = Session()
+    master = InstrumentMaster(str(tmp_path / "instruments_nfo"), smartapi_rows)
+    broker = SmartConnectBroker(gateway, "key", instruments=master)
+
+    async def run():
+        await broker.prefetch(21530.0, "2024-01-04")
+        return [await broker.option_contract(strike, "2024-01-04", option_type)
+                for strike, option_type in ((21500, 'CE'), (21550, 'CE'), (21500, 'PE'), (21600, 'CE'))]
+
+    try:
+        contracts = asyncio.run(run())
+    finally:
+        gateway.shutdown()
+    assert contracts == [("35003", "NIFTY04JAN2421500CE"), ("35011", "NIFTY04JAN2421550CE"),
+                         ("35004", "NIFTY04JAN2421500PE"), (None, None)]
+    assert len(gateway.session.requests) == 1
+    assert master.strikes_around(21530.0, "2024-01-04") == [21500.0, 21550.0]
+
+    # A restart the same day reads the cached file
+    again = InstrumentMaster(str(tmp_path / "instruments_nfo"), smartapi_rows)
+    again.ensure_loaded(None)
+    assert again.lookup(21550, "2024-01-04") == ("35011", "NIFTY04JAN2421550CE")
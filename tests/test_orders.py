@@ -0,0 +1,139 @@
+import asyncio
+
+from brokers import BrokerAdapter, SmartConnectBroker
+from instruments import InstrumentMaster
+from orders import OrderManager, RetryBudget
+
+
+class TimeoutBroker(BrokerAdapter):
+    # Every send times out; `reaches` decides whether it got to the exchange anyway
+    reports_orders = True
+    tags_orders = True
+    order_rate = None
+
+    def __init__(self, reaches=True, book_error=None, book_errors=None):
+        super().__init__(None, None, "256265")
+        self.reaches = reaches
+        self.book_error = book_error
+        self.book_errors = book_errors or 0  # reads that fail before the book answers
+        self.sent = []
+
+    async def place_order(self, token, symbol, side, quantity, order_type="MARKET", price=0.0, trigger_price=0.0,
+                          tag=None):
+        self.sent.append(tag)
+        raise TimeoutError("no answer")
+
+    async def order_book(self):
+        if self.book_error:
+            raise self.book_error
+        if self.book_errors:
+            self.book_errors -= 1
+            raise ConnectionError("book down")
+        if not self.reaches:
+            return []
+        return [{'order_id': f"X{i}", 'tag': tag, 'status': 'complete', 'filled': 50, 'average_price': 101.0}
+                for i, tag in enumerate(self.sent)]
+
+
+def no_backoff(sleep):
+    async def fast(delay, *args):
+        await sleep(0)
+    return fast
+
+
+def settle(broker, **manager):
+    finals = []
+
+    async def run():
+        orders = OrderManager(broker, finals.append, budget=RetryBudget(10), **manager)
+        orders.submit("tag1", "1001", "SYM", "BUY", 50)
+        while not finals:
+            await asyncio.sleep(0.01)
+
+    asyncio.run(asyncio.wait_for(run(), 10))
+    return finals
+
+
+def test_timed_out_send_is_adopted_not_resent():
+    broker = TimeoutBroker(reaches=True)
+    [record] = settle(broker)
+    assert broker.sent == ["tag1"]
+    assert (record['status'], record['order_id'], record['average_price']) == ('complete', 'X0', 101.0)
+
+
+def test_no_resend_without_an_order_book():
+    broker = TimeoutBroker(book_error=ConnectionError("book down"))
+    [record] = settle(broker)
+    assert broker.sent == ["tag1"]
+    assert record['status'] == 'failed' and "not resent" in record['error']
+
+
+def test_no_resend_when_orders_cannot_be_found_by_tag():
+    broker = TimeoutBroker(reaches=False)
+    broker.tags_orders = False
+    [record] = settle(broker)
+    assert broker.sent == ["tag1"]
+    assert record['status'] == 'failed'
+
+
+def test_resent_once_the_book_shows_it_never_arrived(monkeypatch):
+    monkeypatch.setattr(asyncio, "sleep", no_backoff(asyncio.sleep))
+    broker = TimeoutBroker(reaches=False)
+    [record] = settle(broker, max_attempts=3)
+    assert broker.sent == ["tag1"] * 3
+    assert record['status'] == 'failed'
+
+
+def resume(broker, sent=()):
+    # An order sent by the previous process, looked up again after a restart
+    broker.sent = list(sent)
+    finals = []
+
+    async def run():
+        orders = OrderManager(broker, finals.append, poll_interval=0.01)
+        record = await orders.resume("tag1", "1001", "SYM", "SELL", 50)
+        for _ in range(100):
+            if record['status'] != 'open' or not record['tracked']:
+                break
+            await asyncio.sleep(0.01)
+        return record
+
+    return asyncio.run(asyncio.wait_for(run(), 10)), finals
+
+
+def test_resume_without_tag_lookup_leaves_the_order_open():
+    broker = TimeoutBroker(reaches=False)
+    broker.tags_orders = False
+    record, finals = resume(broker)
+    assert finals == []
+    assert (record['status'], record['tracked']) == ('open', False)
+
+
+def test_resume_asks_again_while_the_book_is_down():
+    broker = TimeoutBroker(book_errors=2)
+    record, finals = resume(broker, sent=["tag1"])
+    assert finals == [record]
+    assert (record['status'], record['order_id']) == ('complete', 'X0')
+
+
+def test_resume_fails_only_when_the_book_lacks_the_tag():
+    broker = TimeoutBroker(reaches=False)
+    record, finals = resume(broker)
+    assert finals == [record]
+    assert record['status'] == 'failed'
+
+
+class StubGateway:
+    def __init__(self, response):
+        self.response = response
+
+    async def place_order(self, order_params):
+        return self.response
+
+
+def test_smartconnect_place_order_accepts_bare_order_id(tmp_path):
+    instruments = InstrumentMaster(str(tmp_path / "instruments_nfo"), None)
+    for response in ("240101000000123", {'status': True, 'data': {'orderid': "240101000000123"}}):
+        broker = SmartConnectBroker(StubGateway(response), "key", instruments=instruments)
+        ack = asyncio.run(broker.place_order("1001", "SYM", "BUY", 50, tag="tag1"))
+        assert ack == {'order_id': "240101000000123", 'average_price': None}
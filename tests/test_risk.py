@@ -0,0 +1,206 @@
+import asyncio
+
+import pytest
+
+import engine as engine_module
+from decoders import Tick
+from risk import RiskGate, RiskLimits
+from tests.helpers import LOT_SIZE, START_MS, paper_engine
+
+BAR_MS = 5 * 60000
+STRIKE = 21300  # entry_strike() of a 21500 close with the default -200 offset
+
+
+@pytest.fixture(autouse=True)
+def signal_every_bar(monkeypatch):
+    # Every closed bar is an entry signal, so the tests drive the risk gate alone
+    monkeypatch.setattr(engine_module, "entry_signal",
+                        lambda indicators, state: {'timestamp': state['signal_bar'], 'close': 21500.0})
+
+
+def make(tmp_path, **limits):
+    return paper_engine(tmp_path, risk=RiskGate(RiskLimits(**limits)))
+
+
+async def signal(engine, bar_ms):
+    engine.state['signal_bar'] = bar_ms
+    await engine.on_candle({'timestamp': bar_ms, 'open': 21500.0, 'high': 21500.0, 'low': 21500.0,
+                            'close': 21500.0})
+    await settle()
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def option_tick(engine, token, ts_ms, ltp):
+    # What process_ticks does with an option tick: fills first, then the strategy
+    tick = Tick(token, ts_ms, ltp)
+    for update in engine.broker.observe(tick):
+        engine.orders.update(update)
+    await engine.on_option_tick(tick)
+    await settle()
+
+
+async def contract(engine):
+    token, _ = await engine.broker.option_contract(STRIKE, engine.expiry_date, 'CE')
+    return str(token)
+
+
+def sides(engine):
+    return [(o['side'], o['order_type'], o['status']) for o in engine.broker.exchange.orders.values()]
+
+
+def refused(engine):
+    return [message for kind, message in engine.events if kind == "warning" and "refused" in message]
+
+
+def test_entry_refused_without_a_price_under_an_exposure_limit(tmp_path):
+    engine = make(tmp_path, max_exposure=20000)
+
+    async def run():
+        engine.load_state()
+        await signal(engine, START_MS)
+        assert engine.state['position'] is None
+        # Once the exchange has seen the option, it is priced: 300 x 50 fits
+        engine.broker.exchange.on_tick(await contract(engine), START_MS, 300.0)
+        await signal(engine, START_MS + BAR_MS)
+
+    asyncio.run(run())
+    assert refused(engine) == ["Entry on 21300 CE refused: entry would exceed the exposure limit"]
+    assert engine.state['position']['entry_order'] is not None
+    assert engine.risk.exposure == 300.0 * LOT_SIZE and engine.risk.entries == 1
+
+
+def test_entry_refused_past_exposure_limit(tmp_path):
+    engine = make(tmp_path, max_exposure=10000)
+
+    async def run():
+        engine.load_state()
+        engine.broker.exchange.on_tick(await contract(engine), START_MS, 300.0)
+        await signal(engine, START_MS)
+
+    asyncio.run(run())
+    assert engine.state['position'] is None
+    assert sides(engine) == []
+
+
+def test_loss_cooldown_and_trade_limit(tmp_path):
+    engine = make(tmp_path, loss_cooldown_minutes=30, max_trades=2)
+
+    async def run():
+        engine.load_state()
+        token = await contract(engine)
+        await signal(engine, START_MS)
+        ts = START_MS + BAR_MS
+        for price in (300.0, 300.0, 300.0, 280.0, 280.0):  # filled, stopped out below the 5% trail
+            ts += 1000
+            await option_tick(engine, token, ts, price)
+        assert engine.state['position'] is None and engine.risk.realized < 0
+        await signal(engine, START_MS + BAR_MS)
+        assert refused(engine)[-1].endswith("cooling down after a losing trade")
+        await signal(engine, START_MS + 8 * BAR_MS)
+        assert engine.state['position'] is not None
+        engine.state['position'] = None  # abandon it; the entry still counts
+        await signal(engine, START_MS + 9 * BAR_MS)
+
+    asyncio.run(run())
+    assert refused(engine)[-1].endswith("daily trade limit reached")
+    assert engine.risk.entries == 2
+
+
+def test_order_rate_limit(tmp_path):
+    engine = make(tmp_path, max_orders_per_minute=1)
+
+    async def run():
+        engine.load_state()
+        await signal(engine, START_MS)
+        engine.state['position'] = None
+        await signal(engine, START_MS + 30000)
+        assert refused(engine)[-1].endswith("order rate limit reached")
+        await signal(engine, START_MS + 60000)
+
+    asyncio.run(run())
+    assert engine.risk.entries == 2
+
+
+def test_kill_switch_cancels_the_stop_then_exits_at_market(tmp_path):
+    engine = make(tmp_path, max_daily_loss=500)
+
+    async def run():
+        engine.load_state()
+        token = await contract(engine)
+        await signal(engine, START_MS - BAR_MS)
+        ts = START_MS
+        for price in (300.0, 300.0, 299.0, 296.0):
+            ts += 1000
+            await option_tick(engine, token, ts, price)
+        assert sides(engine) == [('BUY', 'MARKET', 'complete'), ('SELL', 'SL-M', 'open')]
+        ts += 1000
+        await option_tick(engine, token, ts, 290.0)  # -500 open: trips before the 285 stop
+        assert engine.risk.killed == 'daily_loss'
+        for _ in range(3):
+            ts += 1000
+            await option_tick(engine, token, ts, 290.0)
+        await signal(engine, START_MS + BAR_MS)
+
+    asyncio.run(run())
+    assert sides(engine) == [('BUY', 'MARKET', 'complete'), ('SELL', 'SL-M', 'cancelled'),
+                             ('SELL', 'MARKET', 'complete')]
+    assert engine.state['position'] is None
+    assert engine.risk.realized == pytest.approx(-500.0)
+    assert refused(engine)[-1].endswith("daily loss limit hit; trading stopped for the day")
+
+
+def test_counters_survive_a_restart_through_the_journal(tmp_path):
+    engine = make(tmp_path, max_daily_loss=500, loss_cooldown_minutes=30)
+
+    async def run():
+        engine.load_state()
+        token = await contract(engine)
+        await signal(engine, START_MS - BAR_MS)
+        ts = START_MS
+        for price in (300.0, 300.0, 290.0, 290.0, 290.0):
+            ts += 1000
+            await option_tick(engine, token, ts, price)
+
+    asyncio.run(run())
+    assert engine.risk.killed and engine.state['position'] is None
+    counters = engine.risk.counters()
+
+    restarted = make(tmp_path, max_daily_loss=500, loss_cooldown_minutes=30)
+    restarted.load_state()
+    assert restarted.risk.counters() == counters
+
+    async def after():
+        await signal(restarted, START_MS + BAR_MS)
+        assert restarted.state['position'] is None
+        # The next trading day starts over
+        await signal(restarted, START_MS + 24 * 60 * 60000)
+
+    asyncio.run(after())
+    assert refused(restarted) == ["Entry on 21300 CE refused: daily loss limit hit; trading stopped for the day"]
+    assert restarted.state['position'] is not None
+    assert restarted.risk.killed is None and restarted.risk.realized == 0.0
+
+    replayed = make(tmp_path, max_daily_loss=500, loss_cooldown_minutes=30)
+    replayed.load_state()  # the journal has the new entry and its order
+    assert replayed.risk.counters() == restarted.risk.counters()
+
+    restarted.save_state()  # a compacted snapshot keeps them too
+    again = make(tmp_path, max_daily_loss=500, loss_cooldown_minutes=30)
+    again.load_state()
+    assert again.risk.counters() == restarted.risk.counters()
+
+
+def test_gate_limits_without_an_engine():
+    gate = RiskGate(RiskLimits(max_daily_loss=5000, max_exposure=50000, loss_cooldown_minutes=15))
+    assert gate.check_entry(START_MS, None) == 'exposure'
+    gate.record_order()
+    gate.opened(15000.0)
+    assert not gate.mark(START_MS + 1000, -4000.0)
+    assert gate.closed(-4000.0) is False
+    assert gate.check_entry(START_MS + 60000) == 'cooldown'
+    assert gate.mark(START_MS + 16 * 60000, -1000.0)
+    assert gate.check_entry(START_MS + 16 * 60000) == 'kill_switch'
@@ -0,0 +1,81 @@
+import os
+import subprocess
+import sys
+import uuid
+from multiprocessing import resource_tracker
+
+import pytest
+
+import headless
+from snapshot import HEADER, SnapshotWriter, read_snapshot, running, writer_pid
+
+
+@pytest.fixture
+def name():
+    return f"test_{uuid.uuid4().hex[:12]}"
+
+
+def dead_pid():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def leave_stale(name, data=None):
+    # What a SIGKILLed engine leaves behind: a segment whose writer is gone
+    writer = SnapshotWriter(name)
+    writer.write(data or {'status': "running"})
+    HEADER.pack_into(writer.shm.buf, 0, writer.seq, HEADER.unpack_from(writer.shm.buf, 0)[1], dead_pid())
+    resource_tracker.unregister(writer.shm._name, "shared_memory")
+    writer.shm.close()
+
+
+def test_live_writer_is_running_and_not_replaced(name):
+    writer = SnapshotWriter(name)
+    try:
+        writer.write({'status': "running"})
+        assert running(name) and writer_pid(name) == os.getpid()
+        assert read_snapshot(name) == {'status': "running"}
+        with pytest.raises(RuntimeError):
+            SnapshotWriter(name)
+        assert read_snapshot(name) == {'status': "running"}
+    finally:
+        writer.close()
+    assert not running(name)
+
+
+def test_stale_segment_is_not_running_and_stop_removes_it(name):
+    leave_stale(name)
+    assert read_snapshot(name) == {'status': "running"}
+    assert not running(name)
+    assert headless.stop(name) is False
+    assert writer_pid(name) is None
+    assert not headless.stop(name)
+
+
+def test_new_writer_replaces_stale_segment(name):
+    leave_stale(name)
+    writer = SnapshotWriter(name)
+    try:
+        assert running(name)
+        assert read_snapshot(name) is None  # nothing published yet
+    finally:
+        writer.close()
+
+
+def dashboard_page(name):
+    import dashboard
+    dashboard.poll(name)
+
+
+def test_dashboard_shows_a_crashed_engine_and_stops_polling(name):
+    from streamlit.testing.v1 import AppTest
+    leave_stale(name, {'status': "running", 'paper': True, 'broker': "angelone", 'pid': 1, 'updated': 0.0,
+                       'position': None, 'realized_pnl': 0.0, 'trades': 0, 'open_pnl': None, 'candles': [],
+                       'indicators': None, 'candle_minutes': 5, 'events': []})
+    try:
+        app = AppTest.from_function(dashboard_page, args=(name,)).run(timeout=10)
+    finally:
+        headless.stop(name)
+    assert "crashed" in app.caption[0].value
+    assert "is gone" in app.error[0].value
@@ -0,0 +1,50 @@
+import asyncio
+from datetime import date, timedelta
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from history import HistoryStore
+from warmup import CandleCache, SESSION_CLOSE_MS, SESSION_OPEN_MS, day_start_ms
+
+TOKEN = "256265"
+TODAY = date(2024, 1, 5)
+NOW_MS = day_start_ms(TODAY) + 11 * 3600 * 1000
+
+
+class HistoryBroker:
+    def __init__(self):
+        self.calls = []
+
+    async def history(self, token, minutes, from_ms, to_ms):
+        self.calls.append((from_ms, to_ms))
+        start = from_ms - from_ms % 60000
+        return [[t, 100.0, 101.0, 99.0, 100.5] for t in range(start, to_ms, 15 * 60000)]
+
+
+def record_day(store, day, start_ms, end_ms):
+    base = day_start_ms(day)
+    for ts in range(base + start_ms, base + end_ms, 20000):
+        store.record(TOKEN, ts, 21000.0 + (ts // 20000) % 7)
+
+
+def test_recorded_full_sessions_skip_the_broker(tmp_path):
+    store = HistoryStore(str(tmp_path / "history"), flush_interval=3600)
+    for n in (3, 2):
+        record_day(store, TODAY - timedelta(days=n), SESSION_OPEN_MS, SESSION_CLOSE_MS)
+    # Restarted mid-session: this day is incomplete and must come from the broker
+    record_day(store, TODAY - timedelta(days=1), 13 * 3600 * 1000, SESSION_CLOSE_MS)
+    store.close()
+    broker = HistoryBroker()
+    cache = CandleCache(str(tmp_path / "cache"), days=3)
+
+    rows = asyncio.run(cache.recent(broker, TOKEN, 1, NOW_MS, store))
+
+    assert broker.calls == [(day_start_ms(TODAY - timedelta(days=1)), NOW_MS)]
+    first_day = [r for r in rows if r[0] < day_start_ms(TODAY - timedelta(days=2))]
+    assert len(first_day) == (SESSION_CLOSE_MS - SESSION_OPEN_MS) // 60000
+    assert first_day == [[b['timestamp'], b['open'], b['high'], b['low'], b['close']] for b in
+                         store.candles(TOKEN, day_start_ms(TODAY - timedelta(days=3)),
+                                       day_start_ms(TODAY - timedelta(days=2)) - 1)]
+    assert [r[0] for r in rows] == sorted(r[0] for r in rows)
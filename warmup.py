@@ -0,0 +1,96 @@
+import glob
+import gzip
+import json
+import os
+from datetime import datetime, timedelta
+
+from candles import IST
+
+SESSION_OPEN_MS = (9 * 60 + 15) * 60000  # NSE cash session, from IST midnight
+SESSION_CLOSE_MS = (15 * 60 + 30) * 60000
+
+
+def ist_day(ts_ms):
+    return datetime.fromtimestamp(ts_ms / 1000, IST).date()
+
+
+def day_start_ms(day):
+    return int(datetime(day.year, day.month, day.day, tzinfo=IST).timestamp() * 1000)
+
+
+class CandleCache:
+    # Broker history bars for the last `days` calendar days, cached on disk per
+    # (token, timeframe, day) as gzipped JSON rows of [epoch ms, open, high, low,
+    # close]. Finished days never change, so a restart only fetches today's bars.
+    # A day the local tick history (history.py) recorded from open to close is read
+    # from its memory-mapped files; the other missing days come back in one bulk call.
+    def __init__(self, directory="candle_cache", days=4):
+        self.directory = directory
+        self.days = days
+
+    @classmethod
+    def from_env(cls):
+        return cls(os.environ.get("CANDLE_CACHE", "candle_cache"), int(os.environ.get("WARMUP_DAYS", 4)))
+
+    def cache_path(self, token, minutes, day):
+        return os.path.join(self.directory, f"{token}_{minutes}m_{day}.json.gz")
+
+    def load(self, path):
+        try:
+            with gzip.open(path, "rt") as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Error reading candle cache {path}: {e}")
+            return None
+
+    def save(self, path, rows):
+        tmp = path + ".tmp"
+        with gzip.open(tmp, "wt") as f:
+            json.dump(rows, f, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    def recorded(self, history, token, minutes, day):
+        # The day's bars from the tick history, only when it covers the whole session
+        start = day_start_ms(day)
+        try:
+            bars = history.candles(token, start, start + SESSION_CLOSE_MS, minutes)
+        except Exception as e:
+            print(f"Error reading tick history for {day}: {e}")
+            return None
+        if not bars or bars[0]['timestamp'] > start + SESSION_OPEN_MS + minutes * 60000 or \
+                bars[-1]['timestamp'] < start + SESSION_CLOSE_MS - 2 * minutes * 60000:
+            return None
+        return [[b['timestamp'], b['open'], b['high'], b['low'], b['close']] for b in bars]
+
+    async def recent(self, broker, token, minutes, now_ms, history=None):
+        # [[epoch ms, open, high, low, close], ...] from the start of the first day up to now, oldest first
+        today = ist_day(now_ms)
+        days = [today - timedelta(days=n) for n in range(self.days, 0, -1)]
+        cached = {}
+        for day in days:
+            path = self.cache_path(token, minutes, day)
+            if os.path.exists(path):
+                rows = self.load(path)
+                if rows is not None:
+                    cached[day] = rows
+            elif history is not None:
+                rows = self.recorded(history, token, minutes, day)
+                if rows is not None:
+                    cached[day] = rows
+        missing = [day for day in days if day not in cached]
+        start = missing[0] if missing else today
+        fetched = await broker.history(token, minutes, day_start_ms(start), now_ms)
+        by_day = {}
+        for row in fetched:
+            by_day.setdefault(ist_day(row[0]), []).append(row)
+        if missing and fetched:
+            # An empty answer may be an adapter without history rather than holidays: cache nothing
+            os.makedirs(self.directory, exist_ok=True)
+            for day in missing:
+                self.save(self.cache_path(token, minutes, day), by_day.get(day, []))
+        first = (days[0] if days else today).isoformat()
+        for old in glob.glob(self.cache_path(token, minutes, "*")):
+            if old.rsplit("_", 1)[1].split(".", 1)[0] < first:
+                os.remove(old)
+        rows = [row for day in days for row in cached.get(day, by_day.get(day, []))]
+        return rows + by_day.get(today, [])